@@ -0,0 +1,92 @@
+from datetime import datetime, timezone
+import hashlib
+
+from django.core.cache import caches
+
+from recipes.ingredient_index import ingredient_index
+from recipes.models import Recipe, ShoppingCart
+from recipes.tag_registry import tag_registry
+from .serializers.user_serializers import get_subscribed_ids
+
+RECIPE_CACHE_ALIAS = 'recipes'
+
+
+def reference_etag(index):
+    def etag(request, *args, **kwargs):
+        return f'{index.model._meta.model_name}-{index.version()}'
+    return etag
+
+
+def reference_last_modified(index):
+    def last_modified(request, *args, **kwargs):
+        return datetime.fromtimestamp(index.version() // 10 ** 9,
+                                      tz=timezone.utc)
+    return last_modified
+
+
+def recipe_etag(request, pk=None, *args, **kwargs):
+    fields = ['updated_at', 'author_id', 'author__email', 'author__username',
+              'author__first_name', 'author__last_name', 'author__avatar',
+              'author__renditions', 'author__recipes_count',
+              'author__followers_count', 'favorites_count', 'in_carts_count']
+    try:
+        recipes = Recipe.objects.filter(pk=pk)
+    except ValueError:
+        return None
+    user = request.user
+    if user.is_authenticated:
+        recipes = recipes.with_user_annotations(user)
+        fields += ['is_favorited', 'is_in_shopping_cart']
+    state = recipes.values_list(*fields).first()
+    if state is None:
+        return None
+    payload = repr((
+        state,
+        state[1] in get_subscribed_ids(request),
+        _reference_versions(),
+    ))
+    return hashlib.md5(payload.encode()).hexdigest()
+
+
+def shopping_cart_etag(request, *args, **kwargs):
+    cart = ShoppingCart.objects.filter(user=request.user).order_by(
+        'recipe_id').values_list('recipe_id', 'recipe__updated_at')
+    payload = repr((
+        request.accepted_renderer.format,
+        list(cart),
+        ingredient_index.version(),
+    ))
+    return hashlib.md5(payload.encode()).hexdigest()
+
+
+def _reference_versions():
+    return f'{tag_registry.version()}-{ingredient_index.version()}'
+
+
+def _recipe_key(recipe_id, updated_at, versions):
+    return f'recipe:{recipe_id}:{updated_at.timestamp()}:{versions}'
+
+
+def get_recipe_fragments(recipes):
+    versions = _reference_versions()
+    keys = {_recipe_key(recipe.id, recipe.updated_at, versions): recipe.id
+            for recipe in recipes}
+    fragments = caches[RECIPE_CACHE_ALIAS].get_many(keys)
+    return {keys[key]: fragment for key, fragment in fragments.items()}
+
+
+def set_recipe_fragments(fragments):
+    versions = _reference_versions()
+    caches[RECIPE_CACHE_ALIAS].set_many({
+        _recipe_key(recipe.id, recipe.updated_at, versions): fragment
+        for recipe, fragment in fragments.items()
+    })
+
+
+def invalidate_recipes(recipe_ids):
+    versions = _reference_versions()
+    caches[RECIPE_CACHE_ALIAS].delete_many([
+        _recipe_key(recipe_id, updated_at, versions)
+        for recipe_id, updated_at in Recipe.objects.filter(
+            pk__in=recipe_ids).values_list('id', 'updated_at')
+    ])
@@ -1,16 +1,105 @@
 import base64
+import binascii
+import tempfile
 
-from django.core.files.base import ContentFile
+from PIL import ImageFile
+from django.conf import settings
+from django.core.files.images import get_image_dimensions
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import UploadedFile
 from rest_framework import serializers
 
+from recipes.renditions import SOURCE_KEY
+
+BASE64_MARKER = ';base64,'
+HEADER_MAX_LENGTH = 64
+DECODE_CHUNK_SIZE = 64 * 1024
+BASE64_WHITESPACE = ' \t\n\r\f\v'
+STRIP_WHITESPACE = str.maketrans('', '', BASE64_WHITESPACE)
+
+
+def decode_base64_chunks(data, start):
+    pending = ''
+    for offset in range(start, len(data), DECODE_CHUNK_SIZE):
+        chunk = pending + data[offset:offset + DECODE_CHUNK_SIZE].translate(
+            STRIP_WHITESPACE)
+        length = len(chunk) // 4 * 4
+        pending = chunk[length:]
+        yield base64.b64decode(chunk[:length], validate=True)
+    if pending:
+        raise binascii.Error('Incorrect padding')
+
 
 class Base64ImageField(serializers.ImageField):
+    default_error_messages = {
+        'too_large': 'Размер изображения не должен превышать {max_size} байт.',
+        'too_big': ('Стороны изображения не должны превышать '
+                    '{max_dimension} пикселей.'),
+    }
+
+    def _check_size(self, size):
+        if size > settings.IMAGE_MAX_SIZE:
+            self.fail('too_large', max_size=settings.IMAGE_MAX_SIZE)
+
+    def _check_dimensions(self, width, height):
+        if max(width, height) > settings.IMAGE_MAX_DIMENSION:
+            self.fail('too_big', max_dimension=settings.IMAGE_MAX_DIMENSION)
+
+    def _decode(self, data):
+        header_end = data.find(BASE64_MARKER, 0, HEADER_MAX_LENGTH)
+        if header_end == -1:
+            self.fail('invalid_image')
+        file_ext = data[len('data:image/'):header_end]
+        start = header_end + len(BASE64_MARKER)
+        whitespace = sum(data.count(char, start) for char in BASE64_WHITESPACE)
+        size = ((len(data) - start - whitespace) // 4 * 3
+                - data.rstrip(BASE64_WHITESPACE)[-2:].count('='))
+        self._check_size(size)
+        upload = UploadedFile(
+            tempfile.SpooledTemporaryFile(
+                max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE),
+            name=f'temp.{file_ext}', content_type=f'image/{file_ext}',
+            size=size
+        )
+        parser = ImageFile.Parser()
+        try:
+            for chunk in decode_base64_chunks(data, start):
+                upload.write(chunk)
+                if parser is not None:
+                    parser.feed(chunk)
+                    if parser.image is not None:
+                        self._check_dimensions(*parser.image.size)
+                        parser = None
+        except binascii.Error:
+            upload.close()
+            self.fail('invalid_image')
+        except serializers.ValidationError:
+            upload.close()
+            raise
+        upload.seek(0)
+        return upload
+
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith('data:image'):
-            format_info, img_str = data.split(';base64,')
-            file_ext = format_info.split('/')[-1]
-            data = ContentFile(
-                base64.b64decode(img_str),
-                name=f'temp.{file_ext}'
-            )
+            data = self._decode(data)
+        elif hasattr(data, 'size'):
+            self._check_size(data.size)
+            width, height = get_image_dimensions(data)
+            if width is not None:
+                self._check_dimensions(width, height)
         return super().to_internal_value(data)
+
+
+class RenditionsField(serializers.ReadOnlyField):
+    def __init__(self, **kwargs):
+        kwargs.setdefault('source', 'renditions')
+        super().__init__(**kwargs)
+
+    def to_representation(self, renditions):
+        urls = {key: default_storage.url(name)
+                for key, name in renditions.items() if key != SOURCE_KEY}
+        request = self.context.get('request')
+        if request is None:
+            return urls
+        return {key: request.build_absolute_uri(url)
+                for key, url in urls.items()}
@@ -1,6 +1,23 @@
+from django.db.models import Exists, OuterRef
 from django_filters import rest_framework as filters
 
-from recipes.models import Ingredient, Recipe, Tag
+from recipes.models import Recipe
+from recipes.search import search_recipes
+from recipes.tag_registry import tag_registry
+
+RECIPE_ORDERINGS = {
+    'popular': ('-rank__popularity', '-rank__recipe_id'),
+    'trending': ('-rank__trending', '-rank__recipe_id'),
+    'cooking_time': ('cooking_time', '-created_at', '-id'),
+}
+RANK_ORDERINGS = {'popular', 'trending'}
+
+FEED_FILTERS = {'author', 'tags', 'is_favorited', 'is_in_shopping_cart',
+                'search'}
+
+
+def tag_choices():
+    return tag_registry.choices()
 
 
 class RecipeFilter(filters.FilterSet):
@@ -8,13 +25,18 @@ class RecipeFilter(filters.FilterSet):
                                          label='В избраном')
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_is_in_shopping_cart', label='В корзине')
-    tags = filters.ModelMultipleChoiceFilter(
-        queryset=Tag.objects.all(), field_name='tags__slug',
-        to_field_name='slug', label='Теги')
+    tags = filters.MultipleChoiceFilter(choices=tag_choices,
+                                        method='filter_tags', label='Теги')
+    search = filters.CharFilter(method='filter_search', label='Поиск')
+    ordering = filters.ChoiceFilter(
+        choices=[('popular', 'Популярные'), ('trending', 'В тренде'),
+                 ('cooking_time', 'Время приготовления')],
+        method='filter_ordering', label='Сортировка')
 
     class Meta:
         model = Recipe
-        fields = ('author', 'tags', 'is_favorited', 'is_in_shopping_cart')
+        fields = ('author', 'tags', 'is_favorited', 'is_in_shopping_cart',
+                  'search', 'ordering')
 
     def filter_is_favorited(self, queryset, name, value):
         user = self.request.user
@@ -28,10 +50,20 @@ class RecipeFilter(filters.FilterSet):
             return queryset.filter(shoppingcart__user=user)
         return queryset
 
+    def filter_tags(self, queryset, name, value):
+        if not value:
+            return queryset
+        return queryset.filter(Exists(Recipe.tags.through.objects.filter(
+            recipe_id=OuterRef('pk'), tag_id__in=tag_registry.ids(value))))
 
-class IngredientFilter(filters.FilterSet):
-    name = filters.CharFilter(lookup_expr='istartswith', field_name='name')
+    def filter_search(self, queryset, name, value):
+        if not value:
+            return queryset
+        return search_recipes(queryset, value)
 
-    class Meta:
-        model = Ingredient
-        fields = ('name',)
+    def filter_ordering(self, queryset, name, value):
+        if not value:
+            return queryset
+        if value in RANK_ORDERINGS:
+            queryset = queryset.filter(rank__isnull=False)
+        return queryset.order_by(*RECIPE_ORDERINGS[value])
@@ -1,5 +1,75 @@
-from rest_framework.pagination import PageNumberPagination
+from collections import OrderedDict
+import hashlib
+
+from django.core.cache import cache
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
 
 
 class LimitPageNumberPagination(PageNumberPagination):
     page_size_query_param = 'limit'
+    cursor_pagination_class = None
+
+    def use_cursor(self, request):
+        cursor_class = self.cursor_pagination_class
+        return (cursor_class is not None
+                and cursor_class.cursor_query_param in request.query_params)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        if self.use_cursor(request):
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(queryset, request,
+                                                           view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class LimitCursorPagination(CursorPagination):
+    page_size_query_param = 'limit'
+    count_cache_timeout = 60
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = self.get_count(queryset)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_count(self, queryset):
+        query_hash = hashlib.md5(str(queryset.query).encode()).hexdigest()
+        return cache.get_or_set(f'pagination-count:{query_hash}',
+                                queryset.count, self.count_cache_timeout)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('count', self.count),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
+
+
+class RecipeCursorPagination(LimitCursorPagination):
+    ordering = ('-created_at', '-id')
+
+
+class FeedCursorPagination(LimitCursorPagination):
+    ordering = ('-created_at', '-recipe_id')
+
+
+class SubscriptionCursorPagination(LimitCursorPagination):
+    ordering = ('username', 'id')
+
+
+class RecipePagination(LimitPageNumberPagination):
+    cursor_pagination_class = RecipeCursorPagination
+
+    def use_cursor(self, request):
+        return (super().use_cursor(request)
+                and not request.query_params.get('ordering'))
+
+
+class SubscriptionPagination(LimitPageNumberPagination):
+    cursor_pagination_class = SubscriptionCursorPagination
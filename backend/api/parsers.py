@@ -0,0 +1,29 @@
+import json
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import DataAndFiles, MultiPartParser
+
+
+class UploadedFiles(dict):
+    def lists(self):
+        return ((key, [value]) for key, value in self.items())
+
+
+class MultiPartJSONParser(MultiPartParser):
+    def parse(self, stream, media_type=None, parser_context=None):
+        parsed = super().parse(stream, media_type, parser_context)
+        view = (parser_context or {}).get('view')
+        json_fields = getattr(view, 'multipart_json_fields', ())
+        data = {}
+        for key, values in parsed.data.lists():
+            if key in json_fields:
+                try:
+                    values = [json.loads(value) for value in values]
+                except ValueError as error:
+                    raise ParseError(f'{key}: {error}')
+                if len(values) == 1 and isinstance(values[0], list):
+                    values = values[0]
+                data[key] = values
+            else:
+                data[key] = values[-1]
+        return DataAndFiles(data, UploadedFiles(parsed.files.dict()))
@@ -0,0 +1,37 @@
+from django.urls import reverse
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+from recipes.jobs import export_formats
+from recipes.models import ExportJob
+
+
+class ExportJobSerializer(serializers.ModelSerializer):
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ExportJob
+        fields = ('id', 'kind', 'format', 'status', 'error', 'created_at',
+                  'finished_at', 'download_url')
+        read_only_fields = ('status', 'error', 'created_at', 'finished_at')
+
+    def validate(self, data):
+        formats = export_formats(data['kind'])
+        if data['format'] not in formats:
+            raise ValidationError({'format': (
+                f'Доступные форматы: {", ".join(formats)}.')})
+        user = self.context['request'].user
+        if data['kind'] != ExportJob.SHOPPING_LIST and not user.is_staff:
+            raise ValidationError(
+                {'kind': 'Эта выгрузка доступна только администраторам.'})
+        return data
+
+    def create(self, validated_data):
+        return ExportJob.objects.enqueue(self.context['request'].user,
+                                         **validated_data)
+
+    def get_download_url(self, job):
+        if job.status != ExportJob.DONE:
+            return None
+        return self.context['request'].build_absolute_uri(
+            reverse('exports-download', args=(job.pk,)))
@@ -1,11 +1,17 @@
 from django.db import transaction
+from django.db.models import prefetch_related_objects
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
-from rest_framework.validators import UniqueTogetherValidator
 
-from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredients,
-                            ShoppingCart, Tag)
-from ..serializers.user_serializers import Base64ImageField, UserSerializer
+from recipes.ingredient_index import ingredient_index
+from recipes.models import (FeedEntry, Ingredient, Recipe, RecipeIngredients,
+                            ShoppingListItem, Tag)
+from recipes.recipe_index import recipe_ingredient_index
+from recipes.similarity import similar_recipes
+from ..cache import get_recipe_fragments, set_recipe_fragments
+from ..fields import RenditionsField
+from ..serializers.user_serializers import (Base64ImageField, UserSerializer,
+                                            get_subscribed_ids)
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -15,8 +21,7 @@ class TagSerializer(serializers.ModelSerializer):
 
 
 class RecipeIngredientsSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(queryset=Ingredient.objects.all(),
-                                            source='name.id')
+    id = serializers.ReadOnlyField(source='name.id')
     name = serializers.ReadOnlyField(source='name.name')
     measurement_unit = serializers.ReadOnlyField(
         source='name.measurement_unit',)
@@ -26,11 +31,45 @@ class RecipeIngredientsSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'measurement_unit', 'amount')
 
 
-class RecipeReadSerializer(serializers.ModelSerializer):
+class RecipeIngredientsWriteSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField()
+
+    class Meta:
+        model = RecipeIngredients
+        fields = ('id', 'amount')
+
+
+class RecipeListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        recipes = list(data.all() if hasattr(data, 'all') else data)
+        fragments = get_recipe_fragments(recipes)
+        missing = [recipe for recipe in recipes if recipe.id not in fragments]
+        if missing:
+            prefetch_related_objects(missing,
+                                     *Recipe.objects.related_lookups())
+            built = {recipe: self.child.build_fragment(recipe)
+                     for recipe in missing}
+            set_recipe_fragments(built)
+            fragments.update((recipe.id, fragment)
+                             for recipe, fragment in built.items())
+        return [self.child.to_representation(recipe, fragments[recipe.id])
+                for recipe in recipes]
+
+
+class RecipeFragmentSerializer(serializers.ModelSerializer):
     tags = TagSerializer(many=True, read_only=True)
     author = UserSerializer(read_only=True)
     ingredients = RecipeIngredientsSerializer(many=True,
                                               source='recipeingredients',)
+    image_renditions = RenditionsField()
+
+    class Meta:
+        model = Recipe
+        fields = ('id', 'tags', 'author', 'ingredients', 'name', 'image',
+                  'image_renditions', 'text', 'cooking_time',)
+
+
+class RecipeReadSerializer(RecipeFragmentSerializer):
     is_favorited = serializers.BooleanField(read_only=True, default=False)
     is_in_shopping_cart = serializers.BooleanField(read_only=True,
                                                    default=False)
@@ -38,16 +77,53 @@ class RecipeReadSerializer(serializers.ModelSerializer):
     class Meta:
         model = Recipe
         fields = ('id', 'tags', 'author', 'ingredients', 'is_favorited',
-                  'is_in_shopping_cart', 'name', 'image', 'text',
-                  'cooking_time',)
+                  'is_in_shopping_cart', 'name', 'image', 'image_renditions',
+                  'text', 'cooking_time', 'favorites_count',
+                  'in_carts_count',)
+        list_serializer_class = RecipeListSerializer
+
+    def build_fragment(self, instance):
+        prefetch_related_objects([instance],
+                                 *Recipe.objects.related_lookups())
+        return RecipeFragmentSerializer(instance).data
+
+    def to_representation(self, instance, fragment=None):
+        if fragment is None:
+            fragment = get_recipe_fragments([instance]).get(instance.id)
+        if fragment is None:
+            fragment = self.build_fragment(instance)
+            set_recipe_fragments({instance: fragment})
+        request = self.context.get('request')
+        author = dict(fragment['author'])
+        author['is_subscribed'] = (
+            instance.author_id in get_subscribed_ids(request))
+        author['recipes_count'] = instance.author.recipes_count
+        author['followers_count'] = instance.author.followers_count
+        live_fields = {
+            'author': author,
+            'is_favorited': getattr(instance, 'is_favorited', False),
+            'is_in_shopping_cart': getattr(instance, 'is_in_shopping_cart',
+                                           False),
+            'favorites_count': instance.favorites_count,
+            'in_carts_count': instance.in_carts_count,
+        }
+        data = {field: live_fields.get(field, fragment.get(field))
+                for field in self.Meta.fields}
+        if request is not None:
+            for obj, field in ((data, 'image'), (author, 'avatar')):
+                if obj[field]:
+                    obj[field] = request.build_absolute_uri(obj[field])
+                renditions_field = f'{field}_renditions'
+                obj[renditions_field] = {
+                    key: request.build_absolute_uri(url)
+                    for key, url in obj[renditions_field].items()
+                }
+        return data
 
 
 class RecipeWriteSerializer(serializers.ModelSerializer):
-    tags = serializers.PrimaryKeyRelatedField(
-        queryset=Tag.objects.all(),
-        many=True
-    )
-    ingredients = RecipeIngredientsSerializer(many=True)
+    tags = serializers.ListField(child=serializers.IntegerField())
+    ingredients = RecipeIngredientsWriteSerializer(many=True)
     image = Base64ImageField()
 
     class Meta:
@@ -56,30 +132,46 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
                   'cooking_time')
 
     def _validate_unique_tags(self, tags):
-        duplicates = [tag for tag in tags if tags.count(tag) > 1]
-        if duplicates:
+        if len(tags) != len(set(tags)):
             raise ValidationError({'tags': 'Теги не должны повторяться.'})
 
     def _validate_ingredients_list(self, ingredients):
-        ingredient_ids = [ingredient.get('name', {}).get('id') for ingredient
-                          in ingredients]
+        ingredient_ids = [ingredient['id'] for ingredient in ingredients]
         if len(ingredient_ids) != len(set(ingredient_ids)):
             raise ValidationError({'ingredients': 'Нужны разные ингредиенты.'})
 
+    def _find_missing(self, model, ids):
+        instances = model.objects.in_bulk(ids)
+        missing_ids = [str(pk) for pk in ids if pk not in instances]
+        return instances, ', '.join(missing_ids)
+
     def validate(self, data):
         self._validate_unique_tags(data['tags'])
         self._validate_ingredients_list(data['ingredients'])
+        tags, missing_tags = self._find_missing(Tag, data['tags'])
+        ingredient_ids = [ingredient['id']
+                          for ingredient in data['ingredients']]
+        _, missing_ingredients = self._find_missing(Ingredient, ingredient_ids)
+        errors = {}
+        if missing_tags:
+            errors['tags'] = f'Теги не найдены: {missing_tags}.'
+        if missing_ingredients:
+            errors['ingredients'] = (
+                f'Ингредиенты не найдены: {missing_ingredients}.')
+        if errors:
+            raise ValidationError(errors)
+        data['tags'] = [tags[pk] for pk in data['tags']]
         return data
 
     def to_representation(self, instance):
-        return RecipeReadSerializer(instance).data
+        return RecipeReadSerializer(instance, context=self.context).data
 
     def _prepare_ingredients(self, recipe, ingredients_data):
         ingredient_instances = [
             RecipeIngredients(
                 recipe_name=recipe,
-                name=ingredient.pop('name')['id'],
-                **ingredient
+                name_id=ingredient['id'],
+                amount=ingredient['amount']
             )
             for ingredient in ingredients_data
         ]
@@ -90,20 +182,67 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         recipe.tags.set(tags)
         RecipeIngredients.objects.bulk_create(ingredients_data)
 
+    def _update_ingredients(self, recipe, ingredients_data):
+        current_rows = {
+            row.name_id: row
+            for row in recipe.recipeingredients.only('id', 'recipe_name',
+                                                     'name', 'amount')
+        }
+        new_amounts = {
+            ingredient['id']: ingredient['amount']
+            for ingredient in ingredients_data
+        }
+        deltas = {
+            ingredient_id: amount for ingredient_id, amount
+            in new_amounts.items() if ingredient_id not in current_rows
+        }
+        changed_rows = []
+        stale_ids = []
+        for ingredient_id, row in current_rows.items():
+            amount = new_amounts.get(ingredient_id, 0)
+            if amount != row.amount:
+                deltas[ingredient_id] = amount - row.amount
+            if not amount:
+                stale_ids.append(row.id)
+            elif amount != row.amount:
+                row.amount = amount
+                changed_rows.append(row)
+
+        if stale_ids:
+            RecipeIngredients.objects.filter(id__in=stale_ids).delete()
+        if changed_rows:
+            RecipeIngredients.objects.bulk_update(changed_rows, ['amount'])
+        RecipeIngredients.objects.bulk_create([
+            RecipeIngredients(recipe_name=recipe, name_id=ingredient_id,
+                              amount=amount)
+            for ingredient_id, amount in new_amounts.items()
+            if ingredient_id not in current_rows
+        ])
+        ShoppingListItem.objects.apply_recipe_changes(recipe.id, deltas)
+
     def _create_recipe(self, data):
         return Recipe.objects.create(**data,
                                      author=self.context['request'].user,)
 
+    def _index_ingredients(self, recipe, ingredients_data):
+        ingredient_ids = [ingredient['id'] for ingredient in ingredients_data]
+        transaction.on_commit(lambda: recipe_ingredient_index.update_recipe(
+            recipe.id, ingredient_ids))
+        similar_recipes.schedule_refresh([recipe.id])
+
     @transaction.atomic
     def create(self, validated_data):
         ingredients_data = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
 
         recipe_instance = self._create_recipe(validated_data)
+        recipe_instance.author.refresh_from_db(fields=('recipes_count',))
         ingredient_instances = self._prepare_ingredients(recipe_instance,
                                                          ingredients_data)
         self._save_recipe_with_ingredients_and_tags(recipe_instance,
                                                     ingredient_instances, tags)
+        self._index_ingredients(recipe_instance, ingredients_data)
+        FeedEntry.objects.fan_out(recipe_instance)
 
         return recipe_instance
 
@@ -112,51 +251,52 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         ingredients_data = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
 
-        instance.ingredients.clear()
-        instance.tags.clear()
+        instance.tags.set(tags)
+        self._update_ingredients(instance, ingredients_data)
+        self._index_ingredients(instance, ingredients_data)
 
-        ingredient_instances = self._prepare_ingredients(instance,
-                                                         ingredients_data)
-        self._save_recipe_with_ingredients_and_tags(instance,
-                                                    ingredient_instances, tags)
+        old_image = instance.image.name
+        recipe = super().update(instance, validated_data)
+        if old_image and 'image' in validated_data:
+            recipe.image.storage.delete(old_image)
+        return recipe
 
-        return super().update(instance, validated_data)
 
-
-class ShoppingCartSerializer(serializers.ModelSerializer):
+class IngredientSerializer(serializers.ModelSerializer):
     class Meta:
-        model = ShoppingCart
-        fields = ('user', 'recipe')
-        validators = [
-            UniqueTogetherValidator(queryset=ShoppingCart.objects.all(),
-                                    fields=['user', 'recipe'],
-                                    message='Рецепт уже в списке покупок.')
-        ]
+        model = Ingredient
+        fields = ('id', 'name', 'measurement_unit',)
 
 
-class FavoriteSerializer(serializers.ModelSerializer):
+class ShortRecipeInfoSerializer(serializers.ModelSerializer):
+    image_renditions = RenditionsField()
+
     class Meta:
-        model = Favorite
-        fields = ('user', 'recipe')
+        model = Recipe
+        fields = ('id', 'name', 'image', 'image_renditions', 'cooking_time')
 
-    def validate(self, data):
-        user = data['user']
-        recipe = data['recipe']
-        self._check_recipe_is_favorited(user, recipe)
-        return data
 
-    def _check_recipe_is_favorited(self, user, recipe):
-        if Favorite.objects.filter(user=user, recipe=recipe).exists():
-            raise serializers.ValidationError('Рецепт уже в избранном.')
+class CookableRecipeSerializer(RecipeReadSerializer):
+    def to_representation(self, instance, fragment=None):
+        data = super().to_representation(instance, fragment)
+        data['matched_count'] = instance.matched_count
+        data['ingredients_count'] = instance.ingredients_count
+        data['missing_ingredients'] = IngredientSerializer(
+            ingredient_index.get_many(instance.missing_ids), many=True).data
+        return data
 
 
-class IngredientSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Ingredient
-        fields = ('id', 'name', 'measurement_unit',)
+class CookableQuerySerializer(serializers.Serializer):
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=200
+    )
 
 
-class ShortRecipeInfoSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+class RecipeIdsSerializer(serializers.Serializer):
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=100
+    )
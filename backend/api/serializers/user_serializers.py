@@ -2,30 +2,35 @@ from django.contrib.auth import get_user_model
 from rest_framework import serializers
 
 from users.models import Subscription
-from ..fields import Base64ImageField
+from ..fields import Base64ImageField, RenditionsField
 
 User = get_user_model()
 
 
+def get_subscribed_ids(request):
+    if request is None or not request.user.is_authenticated:
+        return frozenset()
+    if not hasattr(request, '_subscribed_ids'):
+        request._subscribed_ids = frozenset(
+            Subscription.objects.filter(user=request.user)
+            .values_list('subscription_id', flat=True)
+        )
+    return request._subscribed_ids
+
+
 class UserSerializer(serializers.ModelSerializer):
     is_subscribed = serializers.SerializerMethodField()
+    avatar_renditions = RenditionsField()
 
     class Meta:
         model = User
         fields = ('email', 'id', 'username', 'first_name', 'last_name',
-                  'is_subscribed', 'avatar')
+                  'is_subscribed', 'avatar', 'avatar_renditions',
+                  'recipes_count', 'followers_count')
 
     def get_is_subscribed(self, obj):
         request = self.context.get('request')
-        user = (
-            request.user
-            if request and request.user.is_authenticated
-            else None
-        )
-        if not user:
-            return False
-        return Subscription.objects.filter(user=user,
-                                           subscription=obj).exists()
+        return obj.id in get_subscribed_ids(request)
 
 
 class AvatarSerializer(serializers.ModelSerializer):
@@ -0,0 +1,32 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from core.transactions import on_commit_batch
+from recipes.models import Recipe
+from recipes.renditions import renditions_ready
+from .cache import invalidate_recipes
+
+User = get_user_model()
+
+AUTHOR_FIELDS = {'email', 'username', 'first_name', 'last_name', 'avatar'}
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_recipes(sender, instance, update_fields=None,
+                              **kwargs):
+    if update_fields and AUTHOR_FIELDS.isdisjoint(update_fields):
+        return
+    on_commit_batch(invalidate_recipes,
+                    instance.recipes.values_list('id', flat=True))
+
+
+@receiver(renditions_ready, sender=Recipe)
+def invalidate_rendered_recipe(sender, pk, **kwargs):
+    invalidate_recipes([pk])
+
+
+@receiver(renditions_ready, sender=User)
+def invalidate_rendered_author(sender, pk, **kwargs):
+    invalidate_recipes(
+        Recipe.objects.filter(author_id=pk).values_list('id', flat=True))
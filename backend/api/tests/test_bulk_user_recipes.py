@@ -0,0 +1,64 @@
+from recipes.models import Favorite, Recipe, ShoppingCart, ShoppingListItem
+from recipes.tests.utils import (FoodgramTestCase, client_for,
+                                 make_ingredients, make_recipe, make_user)
+
+
+class BulkUserRecipesTests(FoodgramTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_user(1)
+        self.client = client_for(self.user)
+        ingredients = make_ingredients(2)
+        self.recipes = [make_recipe(self.user, ingredients, name=f'Рецепт {n}')
+                        for n in range(3)]
+        self.ids = [recipe.id for recipe in self.recipes]
+
+    def test_add_reports_added_skipped_and_missing(self):
+        Favorite.objects.add(user_id=self.user.id, recipe_id=self.ids[0])
+        response = self.client.post('/api/recipes/favorite/', {
+            'recipes': [self.ids[0], self.ids[1], self.ids[1], 999]
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            'added': [self.ids[1]],
+            'skipped': [self.ids[0]],
+            'missing': [999],
+        })
+        self.assertEqual(
+            dict(Recipe.objects.filter(id__in=self.ids[:2])
+                 .values_list('id', 'favorites_count')),
+            {self.ids[0]: 1, self.ids[1]: 1}
+        )
+
+    def test_add_counts_only_inserted_rows(self):
+        Favorite.objects.bulk_create(
+            [Favorite(user=self.user, recipe=self.recipes[0])])
+        report = Favorite.objects.add_recipes(self.user, self.ids[:2])
+        self.assertEqual(report['added'], [self.ids[1]])
+        self.assertEqual(report['skipped'], [self.ids[0]])
+        self.recipes[0].refresh_from_db()
+        self.assertEqual(self.recipes[0].favorites_count, 0)
+
+    def test_remove_reports_removed_skipped_and_missing(self):
+        ShoppingCart.objects.add_recipes(self.user, self.ids[:2])
+        response = self.client.delete('/api/recipes/shopping_cart/', {
+            'recipes': [self.ids[0], self.ids[2], 999]
+        }, format='json')
+        self.assertEqual(response.json(), {
+            'removed': [self.ids[0]],
+            'skipped': [self.ids[2]],
+            'missing': [999],
+        })
+        self.assertEqual(
+            list(ShoppingCart.objects.values_list('recipe_id', flat=True)),
+            [self.ids[1]])
+
+    def test_clear_cart(self):
+        ShoppingCart.objects.add_recipes(self.user, self.ids)
+        response = self.client.delete('/api/recipes/shopping_cart/clear/')
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(ShoppingCart.objects.filter(user=self.user).exists())
+        self.assertFalse(
+            ShoppingListItem.objects.filter(user=self.user).exists())
+        self.assertEqual(
+            set(Recipe.objects.values_list('in_carts_count', flat=True)), {0})
@@ -0,0 +1,65 @@
+from unittest import mock
+
+from django.core.cache import cache
+
+from core.versions import version_key
+from recipes.models import Tag
+from recipes.tests.utils import (FoodgramTestCase, client_for,
+                                 make_ingredients, make_recipe, make_tags,
+                                 make_user)
+
+
+class ConditionalGetTests(FoodgramTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tags = make_tags(2)
+        self.client = client_for()
+
+    def revalidate(self, url, etag):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_reference_list_returns_304_until_changed(self):
+        etag = self.client.get('/api/tags/')['ETag']
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                self.revalidate('/api/tags/', etag).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            Tag.objects.filter(pk=self.tags[0].pk).first().save()
+        self.assertEqual(self.revalidate('/api/tags/', etag).status_code,
+                         200)
+
+    def test_version_bumped_by_another_process_changes_etag(self):
+        etag = self.client.get('/api/tags/')['ETag']
+        cache.delete(version_key(Tag))
+        self.assertEqual(self.revalidate('/api/tags/', etag).status_code,
+                         304)
+        with self.settings(LOCAL_INDEX_TTL=-1):
+            self.assertEqual(
+                self.revalidate('/api/tags/', etag).status_code, 200)
+
+    def test_ingredient_search_skips_shared_cache_within_ttl(self):
+        make_ingredients(3)
+        url = '/api/ingredients/?name=ингр'
+        etag = self.client.get(url)['ETag']
+        with mock.patch('core.versions.cache') as shared_cache:
+            with self.assertNumQueries(0):
+                self.assertEqual(self.client.get(url).status_code, 200)
+                self.assertEqual(self.revalidate(url, etag).status_code,
+                                 304)
+        self.assertEqual(shared_cache.mock_calls, [])
+
+    def test_recipe_etag_follows_updates(self):
+        author = make_user(1)
+        recipe = make_recipe(author, make_ingredients(1), self.tags)
+        url = f'/api/recipes/{recipe.id}/'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.revalidate(url, etag).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            client_for(author).patch(url, {
+                'name': 'Новое название', 'tags': [self.tags[0].id],
+                'ingredients': [{'id': recipe.ingredients.get().id,
+                                 'amount': 1}],
+            }, format='json')
+        response = self.revalidate(url, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['name'], 'Новое название')
@@ -0,0 +1,101 @@
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import FeedEntry, Recipe
+from recipes.tests.utils import (FoodgramTestCase, client_for,
+                                 make_ingredients, make_recipe, make_user)
+from users.models import Subscription
+
+
+class FeedTests(FoodgramTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user(0)
+        cls.authors = [make_user(number) for number in range(1, 5)]
+        cls.ingredients = make_ingredients(1)
+        for number in range(12):
+            make_recipe(cls.authors[number % len(cls.authors)],
+                        cls.ingredients, name=f'Рецепт {number}')
+
+    def follow(self, user, author):
+        Subscription.objects.add(user_id=user.id, subscription_id=author.id)
+
+    def walk(self, user, params=None):
+        client = client_for(user)
+        ids = []
+        response = client.get('/api/recipes/feed/',
+                              {'limit': 2, **(params or {})})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            ids += [item['id'] for item in data['results']]
+            if not data['next']:
+                return ids
+            response = client.get(data['next'])
+
+    def expected(self, authors):
+        return list(Recipe.objects.filter(author__in=authors).order_by(
+            '-created_at', '-id').values_list('id', flat=True))
+
+    def test_feed_walks_followed_recipes_in_order(self):
+        for author in self.authors[:2]:
+            self.follow(self.user, author)
+        self.assertEqual(self.walk(self.user), self.expected(self.authors[:2]))
+
+    def test_feed_applies_recipe_filters(self):
+        for author in self.authors[:2]:
+            self.follow(self.user, author)
+        self.assertEqual(self.walk(self.user, {'author': self.authors[1].id}),
+                         self.expected(self.authors[1:2]))
+
+    def test_unfollow_clears_feed(self):
+        self.follow(self.user, self.authors[0])
+        Subscription.objects.remove(user=self.user,
+                                    subscription=self.authors[0])
+        self.assertEqual(self.walk(self.user), [])
+
+    def test_admin_created_subscription_fills_feed(self):
+        Subscription.objects.create(user=self.user,
+                                    subscription=self.authors[0])
+        self.assertEqual(self.walk(self.user), self.expected(self.authors[:1]))
+        Subscription.objects.get(user=self.user).delete()
+        self.assertFalse(FeedEntry.objects.filter(user=self.user).exists())
+
+    @override_settings(FEED_FANOUT_LIMIT=1)
+    def test_celebrity_recipes_reach_the_feed_on_read(self):
+        author = self.authors[0]
+        fan = make_user(10)
+        self.follow(fan, author)
+        self.follow(self.user, author)
+        recipe = make_recipe(author, self.ingredients, name='Новый')
+        FeedEntry.objects.fan_out(recipe)
+        self.assertFalse(FeedEntry.objects.filter(recipe=recipe).exists())
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.walk(self.user), self.expected([author]))
+        self.assertEqual([query['sql'] for query in queries.captured_queries
+                          if not query['sql'].startswith('SELECT')], [])
+        self.assertFalse(FeedEntry.objects.filter(recipe=recipe).exists())
+
+    @override_settings(FEED_FANOUT_LIMIT=1)
+    def test_feed_merges_celebrity_and_fanned_out_recipes(self):
+        fan = make_user(10)
+        self.follow(fan, self.authors[0])
+        for author in self.authors[:3]:
+            self.follow(self.user, author)
+        self.assertEqual(self.walk(self.user), self.expected(self.authors[:3]))
+        self.assertEqual(self.walk(self.user, {'author': self.authors[0].id}),
+                         self.expected(self.authors[:1]))
+
+    @override_settings(FEED_FANOUT_LIMIT=1)
+    def test_author_dropping_below_limit_keeps_recipes(self):
+        author = self.authors[0]
+        fan = make_user(10)
+        self.follow(fan, author)
+        self.follow(self.user, author)
+        recipe = make_recipe(author, self.ingredients, name='Новый')
+        FeedEntry.objects.fan_out(recipe)
+        Subscription.objects.remove(user=fan, subscription=author)
+        self.assertTrue(FeedEntry.objects.filter(user=self.user,
+                                                 recipe=recipe).exists())
+        self.assertEqual(self.walk(self.user), self.expected([author]))
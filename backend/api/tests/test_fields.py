@@ -0,0 +1,43 @@
+import base64
+from io import BytesIO
+from unittest import mock
+
+from PIL import Image
+from django.test import SimpleTestCase
+from rest_framework.exceptions import ValidationError
+
+from api.fields import Base64ImageField
+
+
+def png_bytes():
+    buffer = BytesIO()
+    Image.new('RGB', (40, 30), 'red').save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+class Base64ImageFieldTests(SimpleTestCase):
+    def decode(self, payload):
+        upload = Base64ImageField().to_internal_value(
+            f'data:image/png;base64,{payload}')
+        return upload.read()
+
+    def test_decodes_in_chunks(self):
+        content = png_bytes()
+        with mock.patch('api.fields.DECODE_CHUNK_SIZE', 10):
+            self.assertEqual(
+                self.decode(base64.b64encode(content).decode()), content)
+
+    def test_accepts_wrapped_base64(self):
+        content = png_bytes()
+        wrapped = base64.encodebytes(content).decode().replace('\n', '\r\n ')
+        for chunk_size in (7, 64 * 1024):
+            with self.subTest(chunk_size=chunk_size), mock.patch(
+                    'api.fields.DECODE_CHUNK_SIZE', chunk_size):
+                self.assertEqual(self.decode(wrapped), content)
+
+    def test_rejects_invalid_base64(self):
+        encoded = base64.b64encode(png_bytes()).decode()
+        for payload in (encoded[:-1], encoded.replace('A', '*', 1)):
+            with self.subTest(payload=payload[:10]):
+                with self.assertRaises(ValidationError):
+                    self.decode(payload)
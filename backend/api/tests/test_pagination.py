@@ -0,0 +1,69 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import Recipe
+from recipes.tests.utils import (FoodgramTestCase, client_for,
+                                 make_ingredients, make_recipe, make_user)
+from users.models import Subscription
+
+
+class CursorPaginationTests(FoodgramTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user(0)
+        cls.authors = [make_user(number) for number in range(1, 8)]
+        ingredients = make_ingredients(1)
+        for number in range(25):
+            make_recipe(cls.authors[number % len(cls.authors)], ingredients,
+                        name=f'Рецепт {number}')
+        for author in cls.authors:
+            Subscription.objects.add(user_id=cls.user.id,
+                                     subscription_id=author.id)
+
+    def walk(self, client, url, params):
+        ids, count_queries = [], 0
+        response = client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            self.assertNotIn('page', data['next'] or '')
+            ids += [item['id'] for item in data['results']]
+            if not data['next']:
+                return ids, data['count'], count_queries
+            with CaptureQueriesContext(connection) as queries:
+                response = client.get(data['next'])
+            count_queries += sum('COUNT(' in query['sql']
+                                 for query in queries.captured_queries)
+
+    def test_recipes_cursor_walks_every_recipe_once(self):
+        ids, count, count_queries = self.walk(
+            client_for(), '/api/recipes/', {'cursor': '', 'limit': 10})
+        self.assertEqual(ids, list(Recipe.objects.order_by(
+            '-created_at', '-id').values_list('id', flat=True)))
+        self.assertEqual(count, 25)
+        self.assertEqual(count_queries, 0)
+
+    def test_recipes_cursor_respects_filters(self):
+        author = self.authors[0]
+        ids, count, _ = self.walk(
+            client_for(), '/api/recipes/',
+            {'cursor': '', 'limit': 2, 'author': author.id})
+        self.assertEqual(sorted(ids), sorted(
+            author.recipes.values_list('id', flat=True)))
+        self.assertEqual(count, len(ids))
+
+    def test_page_number_contract_is_kept(self):
+        response = client_for().get('/api/recipes/',
+                                    {'page': 2, 'limit': 10})
+        data = response.json()
+        self.assertEqual(data['count'], 25)
+        self.assertEqual(len(data['results']), 10)
+        self.assertIn('page=3', data['next'])
+
+    def test_subscriptions_cursor(self):
+        ids, count, _ = self.walk(
+            client_for(self.user), '/api/users/subscriptions/',
+            {'cursor': '', 'limit': 3})
+        self.assertEqual(ids, [author.id for author in sorted(
+            self.authors, key=lambda author: author.username)])
+        self.assertEqual(count, len(self.authors))
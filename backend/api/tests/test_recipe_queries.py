@@ -0,0 +1,97 @@
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from recipes.tests.utils import (FoodgramTestCase, client_for,
+                                 make_ingredients, make_recipe, make_tags,
+                                 make_user)
+from users.models import Subscription
+
+DATABASE_CACHES = {
+    alias: {'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': f'test_{alias}_cache'}
+    for alias in ('default', 'recipes')
+}
+
+
+class RecipeQueryCountTests(FoodgramTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user(1)
+        authors = [make_user(number) for number in range(2, 6)]
+        tags = make_tags(3)
+        ingredients = make_ingredients(5)
+        cls.recipes = [
+            make_recipe(authors[number % len(authors)], ingredients, tags,
+                        name=f'Рецепт {number}')
+            for number in range(60)
+        ]
+        Subscription.objects.add(user_id=cls.user.id,
+                                 subscription_id=authors[0].id)
+        Favorite.objects.add(user_id=cls.user.id, recipe_id=cls.recipes[0].id)
+        ShoppingCart.objects.add(user_id=cls.user.id,
+                                 recipe_id=cls.recipes[1].id)
+
+    def assert_list_queries(self, client, limit, queries):
+        with self.assertNumQueries(queries):
+            response = client.get('/api/recipes/', {'limit': limit})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), limit)
+
+    def test_list_anonymous(self):
+        for limit in (6, 50):
+            with self.subTest(limit=limit):
+                self.reset_caches()
+                self.assert_list_queries(client_for(), limit, 4)
+
+    def test_list_authenticated(self):
+        for limit in (6, 50):
+            with self.subTest(limit=limit):
+                self.reset_caches()
+                self.assert_list_queries(client_for(self.user), limit, 5)
+
+    def test_retrieve(self):
+        for user, queries in ((None, 4), (self.user, 5)):
+            with self.subTest(authenticated=user is not None):
+                self.reset_caches()
+                with self.assertNumQueries(queries):
+                    response = client_for(user).get(
+                        f'/api/recipes/{self.recipes[0].id}/')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.json()['ingredients']), 5)
+                self.assertEqual(len(response.json()['tags']), 3)
+
+
+@override_settings(CACHES=DATABASE_CACHES)
+class DatabaseCacheQueryCountTests(FoodgramTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = make_user(1)
+        tags = make_tags(3)
+        ingredients = make_ingredients(5)
+        for number in range(50):
+            make_recipe(author, ingredients, tags, name=f'Рецепт {number}')
+
+    def setUp(self):
+        call_command('createcachetable', verbosity=0)
+        super().setUp()
+
+    def test_warm_list_reads_fragments_in_one_query(self):
+        client = client_for()
+        for limit in (6, 50):
+            with self.subTest(limit=limit):
+                client.get('/api/recipes/', {'limit': limit})
+                with self.assertNumQueries(3):
+                    response = client.get('/api/recipes/', {'limit': limit})
+                self.assertEqual(len(response.json()['results']), limit)
+
+    def test_fragment_key_follows_updated_at(self):
+        client = client_for()
+        recipe = Recipe.objects.order_by('-created_at', '-id').first()
+        client.get('/api/recipes/', {'limit': 1})
+        Recipe.objects.filter(pk=recipe.pk).update(
+            name='Новое название', updated_at=timezone.now())
+        response = client.get('/api/recipes/', {'limit': 1})
+        self.assertEqual(response.json()['results'][0]['name'],
+                         'Новое название')
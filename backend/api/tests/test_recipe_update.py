@@ -0,0 +1,64 @@
+import re
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import RecipeIngredients
+from recipes.tests.utils import (FoodgramTestCase, client_for,
+                                 make_ingredients, make_recipe, make_tags,
+                                 make_user)
+
+WRITE_PATTERN = re.compile(
+    r'^(INSERT INTO|UPDATE|DELETE FROM) "recipes_recipeingredients"')
+
+
+class RecipeUpdateDiffTests(FoodgramTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = make_user(1)
+        cls.tags = make_tags(3)
+        cls.ingredients = make_ingredients(45)
+
+    def setUp(self):
+        super().setUp()
+        self.client = client_for(self.author)
+
+    def update(self, recipe, amounts, name='Рецепт'):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(f'/api/recipes/{recipe.id}/', {
+                'name': name,
+                'tags': [tag.id for tag in self.tags[:2]],
+                'ingredients': [
+                    {'id': ingredient_id, 'amount': amount}
+                    for ingredient_id, amount in amounts.items()
+                ],
+            }, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(dict(RecipeIngredients.objects.filter(
+            recipe_name=recipe).values_list('name_id', 'amount')), amounts)
+        return [query['sql'] for query in queries.captured_queries]
+
+    def edit(self, size):
+        ingredients = self.ingredients[:size]
+        recipe = make_recipe(self.author, ingredients, self.tags[:2])
+        amounts = {ingredient.id: 20 for ingredient in ingredients[1:]}
+        amounts[self.ingredients[size].id] = 5
+        return self.update(recipe, amounts)
+
+    def test_statements_do_not_grow_with_ingredients(self):
+        small, large = self.edit(5), self.edit(40)
+        self.assertEqual(len(small), len(large))
+        writes = [sql.split(' ')[0] for sql in large
+                  if WRITE_PATTERN.match(sql)]
+        self.assertEqual(sorted(writes), ['DELETE', 'INSERT', 'UPDATE'])
+
+    def test_unchanged_ingredients_are_not_written(self):
+        recipe = make_recipe(self.author, self.ingredients[:10],
+                             self.tags[:2])
+        amounts = {ingredient.id: 10 for ingredient in self.ingredients[:10]}
+        statements = self.update(recipe, amounts, name='Новое название')
+        self.assertFalse([sql for sql in statements
+                          if WRITE_PATTERN.match(sql)])
+        self.assertFalse([sql for sql in statements
+                          if re.match(r'^(INSERT INTO|DELETE FROM) '
+                                      r'"recipes_recipe_tags"', sql)])
@@ -0,0 +1,131 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import override_settings
+
+from recipes.jobs import input_hash
+from recipes.management.commands.rebuild_shopping_lists import (
+    expected_totals, stored_totals)
+from recipes.models import ExportJob, ShoppingListItem
+from recipes.tests.utils import (FoodgramTestCase, client_for,
+                                 make_ingredients, make_recipe, make_tags,
+                                 make_user)
+
+
+class ShoppingListMaintenanceTests(FoodgramTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = make_user(1)
+        cls.buyer = make_user(2)
+        cls.tags = make_tags(1)
+        cls.ingredients = make_ingredients(6)
+        cls.recipes = [
+            make_recipe(cls.author, cls.ingredients[number:number + 3],
+                        cls.tags, amount=10 * (number + 1),
+                        name=f'Рецепт {number}')
+            for number in range(4)
+        ]
+
+    def setUp(self):
+        super().setUp()
+        self.buyer_client = client_for(self.buyer)
+        self.author_client = client_for(self.author)
+
+    def assert_in_sync(self):
+        self.assertEqual(stored_totals(), expected_totals())
+
+    def test_cart_changes_keep_totals(self):
+        for recipe in self.recipes[:2]:
+            self.buyer_client.post(f'/api/recipes/{recipe.id}/shopping_cart/')
+            self.author_client.post(
+                f'/api/recipes/{recipe.id}/shopping_cart/')
+        self.assert_in_sync()
+        self.buyer_client.post('/api/recipes/shopping_cart/', {
+            'recipes': [recipe.id for recipe in self.recipes]
+        }, format='json')
+        self.assert_in_sync()
+        self.buyer_client.delete(
+            f'/api/recipes/{self.recipes[0].id}/shopping_cart/')
+        self.assert_in_sync()
+        self.buyer_client.delete('/api/recipes/shopping_cart/', {
+            'recipes': [self.recipes[1].id, self.recipes[2].id]
+        }, format='json')
+        self.assert_in_sync()
+        self.buyer_client.delete('/api/recipes/shopping_cart/clear/')
+        self.assert_in_sync()
+        self.assertFalse(ShoppingListItem.objects.filter(
+            user=self.buyer).exists())
+
+    def test_recipe_changes_keep_totals(self):
+        for client in (self.buyer_client, self.author_client):
+            client.post('/api/recipes/shopping_cart/', {
+                'recipes': [recipe.id for recipe in self.recipes[:3]]
+            }, format='json')
+        response = self.author_client.patch(
+            f'/api/recipes/{self.recipes[1].id}/', {
+                'tags': [self.tags[0].id],
+                'ingredients': [
+                    {'id': self.ingredients[1].id, 'amount': 5},
+                    {'id': self.ingredients[5].id, 'amount': 7},
+                ],
+            }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assert_in_sync()
+        self.author_client.delete(f'/api/recipes/{self.recipes[2].id}/')
+        self.assert_in_sync()
+
+    def test_rebuild_and_verify(self):
+        self.buyer_client.post('/api/recipes/shopping_cart/', {
+            'recipes': [recipe.id for recipe in self.recipes]
+        }, format='json')
+        ShoppingListItem.objects.filter(user=self.buyer).delete()
+        with self.assertRaises(CommandError):
+            call_command('rebuild_shopping_lists', verify=True)
+        call_command('rebuild_shopping_lists', stdout=StringIO())
+        call_command('rebuild_shopping_lists', verify=True, stdout=StringIO())
+        self.assert_in_sync()
+
+    def test_download_reads_the_aggregate(self):
+        self.buyer_client.post('/api/recipes/shopping_cart/', {
+            'recipes': [self.recipes[0].id, self.recipes[1].id]
+        }, format='json')
+        with self.assertNumQueries(3):
+            response = self.buyer_client.get(
+                '/api/recipes/download_shopping_cart/')
+            content = b''.join(response.streaming_content).decode()
+        self.assertEqual(content.splitlines(), [
+            'Ингредиент 0: 10 г',
+            'Ингредиент 1: 30 г',
+            'Ингредиент 2: 30 г',
+            'Ингредиент 3: 20 г',
+        ])
+
+    @override_settings(SHOPPING_LIST_STREAM_LIMIT=3)
+    def test_large_download_is_handed_to_export_job(self):
+        self.buyer_client.post('/api/recipes/shopping_cart/', {
+            'recipes': [self.recipes[0].id, self.recipes[1].id]
+        }, format='json')
+        response = self.buyer_client.get(
+            '/api/recipes/download_shopping_cart/', {'format': 'csv'})
+        self.assertEqual(response.status_code, 202)
+        job = ExportJob.objects.get(user=self.buyer)
+        self.assertEqual((job.kind, job.format),
+                         (ExportJob.SHOPPING_LIST, 'csv'))
+        self.assertEqual(response.json()['id'], job.id)
+        self.assertTrue(response['Location'].endswith(
+            f'/api/exports/{job.id}/'))
+
+    def test_export_hash_follows_cart_without_reading_rows(self):
+        job = ExportJob(user=self.buyer, kind=ExportJob.SHOPPING_LIST,
+                        format='txt')
+        self.buyer_client.post(f'/api/recipes/{self.recipes[0].id}/'
+                               'shopping_cart/')
+        with mock.patch('recipes.jobs.shopping_list_rows') as rows:
+            first = input_hash(job)
+            self.assertEqual(input_hash(job), first)
+            self.buyer_client.post(f'/api/recipes/{self.recipes[1].id}/'
+                                   'shopping_cart/')
+            self.assertNotEqual(input_hash(job), first)
+        rows.assert_not_called()
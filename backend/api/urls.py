@@ -1,6 +1,7 @@
 from django.urls import include, path
 from rest_framework import routers
 
+from .views.export_views import ExportJobViewSet
 from .views.recipe_views import IngredientViewSet, RecipeViewSet, TagViewSet
 from .views.user_views import CustomUserViewSet
 
@@ -10,6 +11,7 @@ router_v1.register('tags', TagViewSet, basename='tags')
 router_v1.register('ingredients', IngredientViewSet, basename='ingredients')
 router_v1.register('recipes', RecipeViewSet, basename='recipes')
 router_v1.register('users', CustomUserViewSet, basename='users')
+router_v1.register('exports', ExportJobViewSet, basename='exports')
 
 
 urlpatterns = [
@@ -0,0 +1,33 @@
+from django.http import FileResponse
+from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from recipes.models import ExportJob
+from ..serializers.export_serializers import ExportJobSerializer
+
+
+class ExportJobViewSet(mixins.CreateModelMixin, viewsets.ReadOnlyModelViewSet):
+    serializer_class = ExportJobSerializer
+    permission_classes = (IsAuthenticated,)
+
+    def get_queryset(self):
+        return ExportJob.objects.filter(user=self.request.user)
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        job = self.get_object()
+        if job.status != ExportJob.DONE:
+            return Response({'status': job.status},
+                            status=status.HTTP_409_CONFLICT)
+        return FileResponse(
+            job.result.open('rb'), as_attachment=True,
+            filename=f'{job.kind}.{job.format}'
+        )
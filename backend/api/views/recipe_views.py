@@ -1,53 +1,99 @@
 from django.conf import settings
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.cache import patch_cache_control
+from django.utils.decorators import method_decorator
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from django.views.decorators.vary import vary_on_headers
 from django.views.generic.base import RedirectView
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.parsers import JSONParser
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 
-from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredients,
+from recipes.exports import SHOPPING_LIST_FORMATS, shopping_list_rows
+from recipes.ingredient_index import ingredient_index
+from recipes.models import (ExportJob, Favorite, FeedEntry, Ingredient, Recipe,
                             ShoppingCart, Tag)
-from ..filters import IngredientFilter, RecipeFilter
-from ..paginator import LimitPageNumberPagination
+from recipes.recipe_index import recipe_ingredient_index
+from recipes.similarity import similar_recipes
+from recipes.tag_registry import tag_registry
+from ..cache import (recipe_etag, reference_etag, reference_last_modified,
+                     shopping_cart_etag)
+from ..filters import FEED_FILTERS, RecipeFilter
+from ..paginator import (FeedCursorPagination, LimitPageNumberPagination,
+                         RecipePagination)
+from ..parsers import MultiPartJSONParser
 from ..permissions import IsAuthorOrReadOnly
-from ..serializers.recipe_serializers import (FavoriteSerializer,
+from ..renderers import SHOPPING_LIST_RENDERERS
+from ..serializers.export_serializers import ExportJobSerializer
+from ..serializers.recipe_serializers import (CookableQuerySerializer,
+                                              CookableRecipeSerializer,
                                               IngredientSerializer,
+                                              RecipeIdsSerializer,
                                               RecipeReadSerializer,
                                               RecipeWriteSerializer,
-                                              ShoppingCartSerializer,
                                               ShortRecipeInfoSerializer,
                                               TagSerializer)
 
 
+def reference_data_cache(index):
+    return (
+        cache_control(public=True, max_age=0, must_revalidate=True),
+        condition(etag_func=reference_etag(index),
+                  last_modified_func=reference_last_modified(index)),
+    )
+
+
+@method_decorator(reference_data_cache(tag_registry), name='list')
+@method_decorator(reference_data_cache(tag_registry), name='retrieve')
 class TagViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Tag.objects.all().order_by('name')
     serializer_class = TagSerializer
     pagination_class = None
 
 
+@method_decorator(reference_data_cache(ingredient_index), name='list')
+@method_decorator(reference_data_cache(ingredient_index), name='retrieve')
 class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all().order_by('name')
     serializer_class = IngredientSerializer
     pagination_class = None
-    filter_backends = [DjangoFilterBackend]
-    filterset_class = IngredientFilter
 
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get('name')
+        ingredients = (ingredient_index.search(name) if name
+                       else ingredient_index.all())
+        serializer = self.get_serializer(ingredients, many=True)
+        return Response(serializer.data)
 
+
+@method_decorator((
+    cache_control(private=True, max_age=0, must_revalidate=True),
+    vary_on_headers('Authorization'),
+    condition(etag_func=recipe_etag),
+), name='retrieve')
 class RecipeViewSet(viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
-    pagination_class = LimitPageNumberPagination
+    pagination_class = RecipePagination
     filter_backends = [DjangoFilterBackend]
     filterset_class = RecipeFilter
     permission_classes = [IsAuthorOrReadOnly]
+    parser_classes = [JSONParser, MultiPartJSONParser]
+    multipart_json_fields = ('tags', 'ingredients')
 
     def get_queryset(self):
         user = self.request.user
         recipes = super().get_queryset()
         if user.is_authenticated:
             recipes = recipes.with_user_annotations(user)
+        if self.action in ('list', 'retrieve'):
+            recipes = recipes.select_related('author')
         return recipes
 
     def get_serializer_class(self):
@@ -57,72 +103,171 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['post'], url_path='shopping_cart')
     def add_to_shopping_cart(self, request, pk=None):
-        return self._handle_favorite_or_cart_action(
-            request=request, pk=pk, model=ShoppingCart,
-            serializer_class=ShoppingCartSerializer, action='create')
+        return self._add_user_recipe(request, pk, ShoppingCart,
+                                     'Рецепт уже в списке покупок.')
 
     @add_to_shopping_cart.mapping.delete
     def remove_from_shopping_cart(self, request, pk=None):
-        return self._handle_favorite_or_cart_action(
-            request=request, pk=pk, model=ShoppingCart, action='delete')
+        return self._remove_user_recipe(request, pk, ShoppingCart)
 
     @action(detail=True, methods=['post'], url_path='favorite')
     def add_to_favorite(self, request, pk=None):
-        return self._handle_favorite_or_cart_action(
-            request=request, pk=pk, model=Favorite,
-            serializer_class=FavoriteSerializer, action='create')
+        return self._add_user_recipe(request, pk, Favorite,
+                                     'Рецепт уже в избранном.')
 
     @add_to_favorite.mapping.delete
     def remove_from_favorite(self, request, pk=None):
-        return self._handle_favorite_or_cart_action(
-            request=request, pk=pk, model=Favorite,
-            action='delete')
-
-    def _handle_favorite_or_cart_action(self, request, pk, model,
-                                        serializer_class=None,
-                                        action='create'):
-        recipe = get_object_or_404(Recipe, pk=pk)
-
-        if action == 'create':
-            data = {'user': request.user.id, 'recipe': recipe.id}
-            serializer = serializer_class(data=data,
-                                          context={'request': request})
-            serializer.is_valid(raise_exception=True)
-            serializer.save()
-            return Response(
-                ShortRecipeInfoSerializer(recipe).data,
-                status=status.HTTP_201_CREATED
-            )
-        elif action == 'delete':
-            deleted, _ = model.objects.filter(user=request.user,
-                                              recipe=recipe).delete()
-            if deleted:
-                return Response(status=status.HTTP_204_NO_CONTENT)
+        return self._remove_user_recipe(request, pk, Favorite)
+
+    @action(detail=False, methods=['post'], url_path='shopping_cart',
+            url_name='shopping_cart_bulk')
+    def add_many_to_shopping_cart(self, request):
+        return self._add_user_recipes(request, ShoppingCart)
+
+    @add_many_to_shopping_cart.mapping.delete
+    def remove_many_from_shopping_cart(self, request):
+        return self._remove_user_recipes(request, ShoppingCart)
+
+    @action(detail=False, methods=['delete'], url_path='shopping_cart/clear')
+    def clear_shopping_cart(self, request):
+        ShoppingCart.objects.clear(request.user)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=False, methods=['post'], url_path='favorite',
+            url_name='favorite_bulk')
+    def add_many_to_favorite(self, request):
+        return self._add_user_recipes(request, Favorite)
+
+    @add_many_to_favorite.mapping.delete
+    def remove_many_from_favorite(self, request):
+        return self._remove_user_recipes(request, Favorite)
+
+    def _get_recipe_ids(self, request):
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data['recipes']
+
+    def _add_user_recipes(self, request, model):
+        report = model.objects.add_recipes(request.user,
+                                           self._get_recipe_ids(request))
+        return Response(report, status=status.HTTP_200_OK)
+
+    def _remove_user_recipes(self, request, model):
+        report = model.objects.remove_recipes(request.user,
+                                              self._get_recipe_ids(request))
+        return Response(report, status=status.HTTP_200_OK)
+
+    def _add_user_recipe(self, request, pk, model, error_message):
+        recipe = get_object_or_404(
+            Recipe.objects.only('id', 'name', 'image', 'cooking_time',
+                                'renditions'), pk=pk)
+        if not model.objects.add(user_id=request.user.id,
+                                 recipe_id=recipe.id):
             return Response(
-                {'error': 'Recipe not found in the list.'},
+                {api_settings.NON_FIELD_ERRORS_KEY: [error_message]},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        return Response(
+            ShortRecipeInfoSerializer(recipe).data,
+            status=status.HTTP_201_CREATED
+        )
 
-    def _create_shopping_txt(self, ingredients):
-        shopping_list = [
-            (f"{ingredient['name__name']}: "
-             f"{ingredient['total_amount']} "
-             f"{ingredient['name__measurement_unit']}\n")
-            for ingredient in ingredients
-        ]
-        return '\n'.join(shopping_list) + '\n'
+    def _remove_user_recipe(self, request, pk, model):
+        if model.objects.remove(user=request.user, recipe_id=pk):
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        get_object_or_404(Recipe, pk=pk)
+        return Response(
+            {'error': 'Recipe not found in the list.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
 
-    @action(detail=False, methods=['get'])
+    @action(detail=False, methods=['get'],
+            permission_classes=[IsAuthenticated],
+            renderer_classes=SHOPPING_LIST_RENDERERS)
+    @method_decorator(condition(etag_func=shopping_cart_etag))
     def download_shopping_cart(self, request):
-        ingredients = RecipeIngredients.objects.filter(
-            recipe_name__shoppingcart__user=request.user
-        ).values(
-            'name__name', 'name__measurement_unit'
-        ).annotate(
-            total_amount=Sum('amount')
+        renderer = request.accepted_renderer
+        rows = shopping_list_rows(request.user)
+        if rows[settings.SHOPPING_LIST_STREAM_LIMIT:].exists():
+            return self._enqueue_shopping_list(request, renderer.format)
+        response = StreamingHttpResponse(
+            SHOPPING_LIST_FORMATS[renderer.format](rows.iterator()),
+            content_type=f'{renderer.media_type}; charset=utf-8'
         )
-        shopping_list = self._create_shopping_txt(ingredients)
-        return HttpResponse(shopping_list, content_type='text/plain')
+        response['Content-Disposition'] = (
+            f'attachment; filename="shopping_list.{renderer.format}"')
+        patch_cache_control(response, private=True, max_age=0,
+                            must_revalidate=True)
+        return response
+
+    def _enqueue_shopping_list(self, request, format):
+        job = ExportJob.objects.enqueue(request.user, ExportJob.SHOPPING_LIST,
+                                        format)
+        response = JsonResponse(
+            ExportJobSerializer(job, context={'request': request}).data,
+            status=status.HTTP_202_ACCEPTED
+        )
+        response['Location'] = request.build_absolute_uri(
+            reverse('exports-detail', args=(job.pk,)))
+        patch_cache_control(response, private=True, max_age=0,
+                            must_revalidate=True)
+        return response
+
+    @action(detail=False, methods=['get'],
+            permission_classes=[IsAuthenticated],
+            pagination_class=FeedCursorPagination)
+    def feed(self, request):
+        recipes = None
+        if FEED_FILTERS & request.query_params.keys():
+            recipes = self.filter_queryset(Recipe.objects.all())
+        page = self.paginate_queryset(
+            FeedEntry.objects.for_user(request.user, recipes))
+        recipe_ids = [entry['recipe_id'] for entry in page]
+        recipes = self.get_queryset().select_related('author').in_bulk(
+            recipe_ids)
+        serializer = self.get_serializer(
+            [recipes[recipe_id] for recipe_id in recipe_ids
+             if recipe_id in recipes],
+            many=True
+        )
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['get'],
+            pagination_class=LimitPageNumberPagination)
+    def cookable(self, request):
+        serializer = CookableQuerySerializer(data={'ingredients': [
+            value for param in request.query_params.getlist('ingredients')
+            for value in param.split(',') if value
+        ]})
+        serializer.is_valid(raise_exception=True)
+        ingredient_ids = serializer.validated_data['ingredients']
+        ranked = self.paginate_queryset(
+            recipe_ingredient_index.rank(ingredient_ids))
+        recipes = self.get_queryset().select_related('author').in_bulk(
+            [recipe_id for recipe_id, _, _ in ranked])
+        page = []
+        for recipe_id, matched, total in ranked:
+            recipe = recipes.get(recipe_id)
+            if recipe is None:
+                continue
+            recipe.matched_count = matched
+            recipe.ingredients_count = total
+            recipe.missing_ids = recipe_ingredient_index.missing(
+                recipe_id, ingredient_ids)
+            page.append(recipe)
+        return self.get_paginated_response(CookableRecipeSerializer(
+            page, many=True, context=self.get_serializer_context()).data)
+
+    @action(detail=True, methods=['get'])
+    def similar(self, request, pk=None):
+        recipe = get_object_or_404(Recipe.objects.only('id'), pk=pk)
+        neighbors = similar_recipes.get(recipe.id)
+        recipes = self.get_queryset().select_related('author').in_bulk(
+            [recipe_id for recipe_id, _ in neighbors])
+        serializer = self.get_serializer(
+            [recipes[recipe_id] for recipe_id, _ in neighbors
+             if recipe_id in recipes], many=True)
+        return Response(serializer.data)
 
     @action(detail=True, methods=['get'], url_path='get-link')
     def get_link(self, request, pk=None):
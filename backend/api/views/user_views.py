@@ -1,15 +1,20 @@
+from collections import defaultdict
+
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 from djoser.views import UserViewSet
 from rest_framework import status
 from rest_framework.decorators import action
+from rest_framework.parsers import JSONParser, MultiPartParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 
+from recipes.models import Recipe
 from users.models import Subscription
-from ..paginator import LimitPageNumberPagination
-from ..serializers.subscription_serializers import (SubscriptionSerializer,
-                                                    SubscriptionUserSerializer)
+from ..paginator import SubscriptionPagination
+from ..serializers.subscription_serializers import SubscriptionUserSerializer
 from ..serializers.user_serializers import AvatarSerializer
 
 CustomUser = get_user_model()
@@ -25,9 +30,12 @@ class CustomUserViewSet(UserViewSet):
     )
     def list_subscriptions(self, request):
         user = request.user
-        subs = CustomUser.objects.filter(subscription__user=user)
-        paginator = LimitPageNumberPagination()
+        subs = CustomUser.objects.filter(
+            subscription__user=user).order_by('username')
+        paginator = SubscriptionPagination()
         result = paginator.paginate_queryset(subs, request)
+        self._attach_latest_recipes(
+            result, int(request.query_params.get('recipes_limit', 0)))
         serializer = SubscriptionUserSerializer(
             result,
             many=True,
@@ -35,6 +43,15 @@ class CustomUserViewSet(UserViewSet):
         )
         return paginator.get_paginated_response(serializer.data)
 
+    def _attach_latest_recipes(self, authors, limit):
+        latest_recipes = defaultdict(list)
+        recipes = Recipe.objects.latest_for_authors(
+            [author.id for author in authors], limit)
+        for recipe in recipes:
+            latest_recipes[recipe.author_id].append(recipe)
+        for author in authors:
+            author.latest_recipes = latest_recipes[author.id]
+
     @action(
         detail=True,
         methods=['post'],
@@ -47,40 +64,43 @@ class CustomUserViewSet(UserViewSet):
 
     @add_subscription.mapping.delete
     def remove_subscription(self, request, id):
-        target_user = get_object_or_404(CustomUser, id=id)
-        return self._delete_subscription(request, target_user)
+        return self._delete_subscription(request, id)
 
+    @transaction.atomic
     def _create_subscription(self, request, target_user):
-        sub_serializer = SubscriptionSerializer(
-            data={'user': request.user.id, 'subscription': target_user.id},
-            context={'request': request}
-        )
-        sub_serializer.is_valid(raise_exception=True)
-        sub_serializer.save()
+        if request.user == target_user:
+            error_message = 'Ошибка. Подписка на себя.'
+        elif not Subscription.objects.add(user_id=request.user.id,
+                                          subscription_id=target_user.id):
+            error_message = 'Такая подписка уже есть.'
+        else:
+            target_user.refresh_from_db(fields=('followers_count',))
+            return Response(
+                SubscriptionUserSerializer(
+                    target_user,
+                    context={'request': request},
+                ).data,
+                status=status.HTTP_201_CREATED
+            )
         return Response(
-            SubscriptionUserSerializer(
-                target_user,
-                context={'request': request},
-            ).data,
-            status=status.HTTP_201_CREATED
+            {api_settings.NON_FIELD_ERRORS_KEY: [error_message]},
+            status=status.HTTP_400_BAD_REQUEST
         )
 
-    def _delete_subscription(self, request, target_user):
-        user = request.user
-        deleted, _ = Subscription.objects.filter(
-            user=user,
-            subscription=target_user,
-        ).delete()
-
-        if deleted:
+    @transaction.atomic
+    def _delete_subscription(self, request, target_user_id):
+        if Subscription.objects.remove(user=request.user,
+                                       subscription_id=target_user_id):
             return Response(status=status.HTTP_204_NO_CONTENT)
 
+        get_object_or_404(CustomUser, id=target_user_id)
         return Response(
             {'errors': 'Не найдена подписка'},
             status=status.HTTP_400_BAD_REQUEST,
         )
 
-    @action(methods=['put'], detail=False, url_path='me/avatar')
+    @action(methods=['put'], detail=False, url_path='me/avatar',
+            parser_classes=[JSONParser, MultiPartParser])
     def update_avatar(self, request):
         avatar_data = self._handle_avatar(request.data)
         return Response(avatar_data.data)
@@ -88,16 +108,21 @@ class CustomUserViewSet(UserViewSet):
     @update_avatar.mapping.delete
     def remove_avatar(self, request):
         user_instance = self._get_user_instance()
-        user_instance.avatar.delete()
+        avatar = user_instance.avatar
         user_instance.avatar = None
         user_instance.save()
+        if avatar:
+            avatar.storage.delete(avatar.name)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     def _handle_avatar(self, data):
         user_instance = self._get_user_instance()
+        old_avatar = user_instance.avatar.name
         avatar_serializer = AvatarSerializer(user_instance, data=data)
         avatar_serializer.is_valid(raise_exception=True)
         avatar_serializer.save()
+        if old_avatar:
+            user_instance.avatar.storage.delete(old_avatar)
         return avatar_serializer
 
     def get_permissions(self):
@@ -0,0 +1,55 @@
+from django.db import router, transaction
+
+
+class PreservedFieldsMixin:
+    preserved_fields = ()
+
+    def save(self, *args, **kwargs):
+        if (not self._state.adding and not args
+                and kwargs.get('update_fields') is None
+                and not kwargs.get('force_insert')):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in deferred
+                and field.name not in self.preserved_fields
+            ]
+        super().save(*args, **kwargs)
+
+
+class UniquePairMixin:
+    def _pair_queryset(self, using):
+        using = using or router.db_for_write(type(self), instance=self)
+        return type(self)._default_manager.db_manager(using).all()
+
+    def _stored_pair(self, queryset):
+        if self.pk is None:
+            return None
+        return queryset.filter(pk=self.pk).select_for_update().values_list(
+            *queryset.pair_columns()).first()
+
+    def save(self, *args, **kwargs):
+        queryset = self._pair_queryset(kwargs.get('using'))
+        update_fields = kwargs.get('update_fields')
+        if (update_fields is not None
+                and set(queryset.pair_fields).isdisjoint(update_fields)):
+            return super().save(*args, **kwargs)
+        with transaction.atomic(using=queryset.db):
+            stored = self._stored_pair(queryset)
+            super().save(*args, **kwargs)
+            pair = tuple(getattr(self, column)
+                         for column in queryset.pair_columns())
+            if pair != stored:
+                if stored is not None:
+                    queryset.pairs_removed([stored])
+                queryset.pairs_added([pair])
+
+    def delete(self, using=None, keep_parents=False):
+        queryset = self._pair_queryset(using)
+        with transaction.atomic(using=queryset.db):
+            stored = self._stored_pair(queryset)
+            deleted = super().delete(using=queryset.db,
+                                     keep_parents=keep_parents)
+            if stored is not None:
+                queryset.pairs_removed([stored])
+        return deleted
@@ -0,0 +1,135 @@
+from collections import Counter, defaultdict
+import heapq
+from itertools import islice
+from operator import itemgetter
+
+from django.db import connections, models, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from .signals import pairs_added, pairs_removed
+
+
+class UniquePairQuerySet(models.QuerySet):
+    pair_fields = ('user', 'recipe')
+    counter = None
+
+    def pair_columns(self):
+        return [f'{field_name}_id' for field_name in self.pair_fields]
+
+    def pairs_added(self, pairs):
+        self.count_pairs(pairs, 1)
+        if pairs:
+            pairs_added.send(sender=self.model, pairs=pairs, using=self.db)
+
+    def pairs_removed(self, pairs):
+        self.count_pairs(pairs, -1)
+        if pairs:
+            pairs_removed.send(sender=self.model, pairs=pairs, using=self.db)
+
+    def count_pairs(self, pairs, step):
+        if self.counter is None or not pairs:
+            return
+        position = self.pair_fields.index(self.counter[0])
+        self.update_counter([pair[position] for pair in pairs], step)
+
+    def update_counter(self, ids, step):
+        if self.counter is None:
+            return
+        field_name, counter_name = self.counter
+        model = self.model._meta.get_field(field_name).related_model
+        groups = defaultdict(list)
+        for pk, times in Counter(ids).items():
+            groups[times * step].append(pk)
+        for delta, pks in groups.items():
+            model.objects.filter(pk__in=pks).update(**{
+                counter_name: Greatest(F(counter_name) + delta, 0)})
+
+    def insert_ignore(self, rows, returning):
+        if not rows:
+            return []
+        connection = connections[self.db]
+        quote = connection.ops.quote_name
+        model_fields = [field for field in self.model._meta.concrete_fields
+                        if not field.primary_key]
+        columns = ', '.join(quote(field.column) for field in model_fields)
+        row_sql = f'({", ".join(["%s"] * len(model_fields))})'
+        returning_column = quote(
+            self.model._meta.get_field(returning).column)
+        batch_size = connection.ops.bulk_batch_size(model_fields, rows)
+        inserted = []
+        with connection.cursor() as cursor:
+            for start in range(0, len(rows), batch_size):
+                batch = rows[start:start + batch_size]
+                params = []
+                for fields in batch:
+                    instance = self.model(**fields)
+                    params += [
+                        field.get_db_prep_save(
+                            field.pre_save(instance, True), connection)
+                        for field in model_fields
+                    ]
+                cursor.execute(
+                    f'INSERT INTO {quote(self.model._meta.db_table)} '
+                    f'({columns}) VALUES {", ".join([row_sql] * len(batch))} '
+                    f'ON CONFLICT DO NOTHING RETURNING {returning_column}',
+                    params
+                )
+                inserted += [value for value, in cursor.fetchall()]
+        return inserted
+
+    def add(self, **fields):
+        with transaction.atomic(using=self.db):
+            added = bool(self.insert_ignore(
+                [fields], returning=self.model._meta.pk.name))
+            if added:
+                self.pairs_added([tuple(
+                    fields[column] for column in self.pair_columns())])
+        return added
+
+    def remove(self, **fields):
+        deleted, _ = self.filter(**fields).delete()
+        return bool(deleted)
+
+    def delete(self):
+        with transaction.atomic(using=self.db):
+            pairs = list(self.select_for_update().values_list(
+                *self.pair_columns()))
+            deleted = super().delete()
+            self.pairs_removed(pairs)
+        return deleted
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+
+class MergedQuerySet:
+    def __init__(self, *querysets, ordering=()):
+        self.querysets = querysets
+        self.ordering = ordering
+
+    @property
+    def query(self):
+        return ' UNION ALL '.join(str(queryset.query)
+                                  for queryset in self.querysets)
+
+    def filter(self, *args, **kwargs):
+        return MergedQuerySet(
+            *(queryset.filter(*args, **kwargs)
+              for queryset in self.querysets),
+            ordering=self.ordering)
+
+    def order_by(self, *field_names):
+        return MergedQuerySet(
+            *(queryset.order_by(*field_names) for queryset in self.querysets),
+            ordering=field_names)
+
+    def count(self):
+        return sum(queryset.count() for queryset in self.querysets)
+
+    def __getitem__(self, index):
+        start, stop = index.start or 0, index.stop
+        return list(islice(heapq.merge(
+            *(queryset[:stop] for queryset in self.querysets),
+            key=itemgetter(*(name.lstrip('-') for name in self.ordering)),
+            reverse=self.ordering[0].startswith('-')), start, stop))
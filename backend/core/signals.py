@@ -0,0 +1,4 @@
+from django.dispatch import Signal
+
+pairs_added = Signal()
+pairs_removed = Signal()
@@ -0,0 +1,28 @@
+from django.db import transaction
+
+
+class OnCommitBatch:
+    def __init__(self, callback):
+        self.callback = callback
+        self.items = set()
+        self.done = False
+
+    def __call__(self):
+        self.done = True
+        self.callback(self.items)
+
+
+def on_commit_batch(callback, items, using=None):
+    connection = transaction.get_connection(using)
+    if not connection.in_atomic_block:
+        callback(set(items))
+        return
+    for entry in connection.run_on_commit:
+        pending = entry[1]
+        if (isinstance(pending, OnCommitBatch) and not pending.done
+                and pending.callback == callback):
+            pending.items.update(items)
+            return
+    batch = OnCommitBatch(callback)
+    batch.items.update(items)
+    transaction.on_commit(batch, using=using)
@@ -0,0 +1,77 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+def version_key(model):
+    return f'reference-version:{model._meta.label_lower}'
+
+
+def get_version(model):
+    return cache.get_or_set(version_key(model), time.time_ns, None)
+
+
+def get_versions(models):
+    keys = [version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def bump_version(model):
+    version = time.time_ns()
+    cache.set(version_key(model), version, None)
+    return version
+
+
+class VersionedLocalCache:
+    model = None
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = None
+        self._version = None
+        self._checked_at = None
+
+    def build(self):
+        raise NotImplementedError
+
+    def _check_version(self):
+        now = time.monotonic()
+        if (self._version is not None
+                and now - self._checked_at <= settings.LOCAL_INDEX_TTL):
+            return
+        version = get_version(self.model)
+        if version != self._version:
+            self._data = None
+            self._version = version
+        self._checked_at = now
+
+    def _refresh(self):
+        self._check_version()
+        if self._data is None:
+            self._data = self.build()
+
+    def _load(self):
+        with self._lock:
+            self._refresh()
+            return self._data
+
+    def version(self):
+        with self._lock:
+            self._check_version()
+            return self._version
+
+    def _bump(self):
+        self._version = bump_version(self.model)
+        self._checked_at = time.monotonic()
+
+    def invalidate(self):
+        with self._lock:
+            self._data = None
+            self._bump()
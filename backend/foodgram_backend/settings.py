@@ -1,5 +1,6 @@
 import os
 from pathlib import Path
+import tempfile
 
 from django.core.management.utils import get_random_secret_key
 from dotenv import load_dotenv
@@ -82,6 +83,21 @@ else:
         }
     }
 
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND',
+                             'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    },
+    'recipes': {
+        'BACKEND': os.getenv('RECIPE_CACHE_BACKEND',
+                             'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('RECIPE_CACHE_LOCATION', 'recipes'),
+        'TIMEOUT': int(os.getenv('RECIPE_CACHE_TIMEOUT', 60 * 60)),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -122,6 +138,36 @@ MEDIA_URL = '/media/'
 
 MEDIA_ROOT = BASE_DIR / 'media/'
 
+DEFAULT_FILE_STORAGE = 'recipes.storage.ContentAddressedStorage'
+
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
+IMAGE_MAX_SIZE = int(os.getenv('IMAGE_MAX_SIZE', 5 * 1024 * 1024))
+
+IMAGE_MAX_DIMENSION = int(os.getenv('IMAGE_MAX_DIMENSION', 4096))
+
+LOCAL_INDEX_TTL = int(os.getenv('LOCAL_INDEX_TTL', 5 * 60))
+
+SHOPPING_LIST_STREAM_LIMIT = int(os.getenv('SHOPPING_LIST_STREAM_LIMIT',
+                                           1000))
+
+RENDITION_WORKERS = int(os.getenv('RENDITION_WORKERS', 2))
+
+FEED_FANOUT_LIMIT = int(os.getenv('FEED_FANOUT_LIMIT', 1000))
+
+FEED_BACKFILL_SIZE = int(os.getenv('FEED_BACKFILL_SIZE', 100))
+
+TRENDING_WINDOW_DAYS = int(os.getenv('TRENDING_WINDOW_DAYS', 7))
+
+TRENDING_HALF_LIFE_HOURS = float(os.getenv('TRENDING_HALF_LIFE_HOURS', 24))
+
+SIMILAR_RECIPES_PATH = os.getenv(
+    'SIMILAR_RECIPES_PATH',
+    os.path.join(tempfile.gettempdir(), 'foodgram', 'similar_recipes.json')
+)
+
 
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
@@ -1,8 +1,36 @@
+from contextlib import contextmanager
+
 from django.contrib import admin
-from django.db.models import Count
+from django.utils import timezone
+
+from core.transactions import on_commit_batch
+from . import search
+from .models import (ExportJob, Favorite, Ingredient, Recipe,
+                     RecipeIngredients, ShoppingCart, ShoppingListItem, Tag)
+from .recipe_index import recipe_ingredient_index
+from .similarity import similar_recipes
+
 
-from .models import (Favorite, Ingredient, Recipe, RecipeIngredients,
-                     ShoppingCart, Tag)
+@contextmanager
+def tracking_ingredients(recipe_ids):
+    recipe_ids = set(recipe_ids)
+    before = RecipeIngredients.objects.amounts(recipe_ids)
+    yield
+    after = RecipeIngredients.objects.amounts(recipe_ids)
+    Recipe.objects.filter(pk__in=recipe_ids).update(updated_at=timezone.now())
+    for recipe_id in recipe_ids:
+        old, new = before[recipe_id], after[recipe_id]
+        deltas = {
+            ingredient_id: new.get(ingredient_id, 0)
+            - old.get(ingredient_id, 0)
+            for ingredient_id in old.keys() | new.keys()
+            if new.get(ingredient_id) != old.get(ingredient_id)
+        }
+        if deltas:
+            ShoppingListItem.objects.apply_recipe_changes(recipe_id, deltas)
+    on_commit_batch(recipe_ingredient_index.refresh_recipes, recipe_ids)
+    on_commit_batch(search.update_recipes, recipe_ids)
+    similar_recipes.schedule_refresh(recipe_ids)
 
 
 @admin.register(Tag)
@@ -28,6 +56,23 @@ class IngredientAdmin(admin.ModelAdmin):
 class RecipeIngredientsAdmin(admin.ModelAdmin):
     list_display = ('recipe_name', 'name', 'amount',)
 
+    def save_model(self, request, obj, form, change):
+        recipe_ids = {obj.recipe_name_id}
+        if change:
+            recipe_ids.update(RecipeIngredients.objects.filter(
+                pk=obj.pk).values_list('recipe_name_id', flat=True))
+        with tracking_ingredients(recipe_ids):
+            super().save_model(request, obj, form, change)
+
+    def delete_model(self, request, obj):
+        with tracking_ingredients([obj.recipe_name_id]):
+            super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        with tracking_ingredients(
+                queryset.values_list('recipe_name_id', flat=True)):
+            super().delete_queryset(request, queryset)
+
 
 class InlineIngredients(admin.TabularInline):
     model = Recipe.ingredients.through
@@ -36,16 +81,41 @@ class InlineIngredients(admin.TabularInline):
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
     inlines = (InlineIngredients,)
-    list_display = ('author', 'name', 'cooking_time', 'favorite_count',
-                    'created_at',)
-    search_fields = ('author', 'name',)
+    list_display = ('author', 'name', 'cooking_time', 'favorites_count',
+                    'in_carts_count', 'created_at',)
+    list_select_related = ('author',)
+    search_fields = ('name',)
     list_filter = ('tags',)
+    actions = ('export_recipes_csv', 'export_recipes_json')
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        return search.search_recipes(queryset, search_term), False
+
+    def save_related(self, request, form, formsets, change):
+        if not change:
+            return super().save_related(request, form, formsets, change)
+        with tracking_ingredients([form.instance.id]):
+            super().save_related(request, form, formsets, change)
+
+    def _enqueue_export(self, request, format):
+        job = ExportJob.objects.enqueue(request.user, ExportJob.RECIPES,
+                                        format)
+        self.message_user(request, f'Выгрузка {job.pk} поставлена в очередь.')
+
+    @admin.action(description='Выгрузить все рецепты в CSV')
+    def export_recipes_csv(self, request, queryset):
+        self._enqueue_export(request, 'csv')
+
+    @admin.action(description='Выгрузить все рецепты в JSON')
+    def export_recipes_json(self, request, queryset):
+        self._enqueue_export(request, 'json')
 
-    def get_queryset(self, request):
-        queryset = super().get_queryset(request)
-        queryset = queryset.annotate(fav_count=Count('favorite'))
-        return queryset
 
-    @admin.display(description='Кол-во в избранном')
-    def favorite_count(self, obj):
-        return obj.fav_count
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'kind', 'format', 'status', 'result',
+                    'created_at', 'finished_at')
+    list_filter = ('kind', 'status')
+    readonly_fields = ('input_hash', 'started_at', 'finished_at')
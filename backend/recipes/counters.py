@@ -0,0 +1,40 @@
+from django.apps import apps as global_apps
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+COUNTERS = (
+    ('recipes.Recipe', 'favorites_count', 'recipes.Favorite', 'recipe'),
+    ('recipes.Recipe', 'in_carts_count', 'recipes.ShoppingCart', 'recipe'),
+    ('users.CustomUser', 'recipes_count', 'recipes.Recipe', 'author'),
+    ('users.CustomUser', 'followers_count', 'users.Subscription',
+     'subscription'),
+)
+
+
+def expected_count(model, field_name):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field_name: OuterRef('pk')}).order_by()
+        .values(field_name).annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+def counters(apps=global_apps):
+    for label, counter_name, source_label, field_name in COUNTERS:
+        yield (apps.get_model(label), counter_name,
+               expected_count(apps.get_model(source_label), field_name))
+
+
+def drifted_ids(model, counter_name, expected):
+    return list(model.objects.annotate(expected=expected).exclude(
+        **{counter_name: F('expected')}
+    ).values_list('pk', flat=True))
+
+
+def reconcile(apps=global_apps):
+    fixed = {}
+    for model, counter_name, expected in counters(apps):
+        ids = drifted_ids(model, counter_name, expected)
+        if ids:
+            model.objects.filter(pk__in=ids).update(**{counter_name: expected})
+        fixed[f'{model._meta.label}.{counter_name}'] = len(ids)
+    return fixed
@@ -0,0 +1,79 @@
+import csv
+import json
+
+from .models import RecipeIngredients, ShoppingListItem
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def shopping_list_rows(user):
+    return ShoppingListItem.objects.filter(user=user).values_list(
+        'ingredient__name', 'ingredient__measurement_unit', 'amount'
+    ).order_by('ingredient__name')
+
+
+def shopping_list_txt(rows):
+    for name, measurement_unit, amount in rows:
+        yield f'{name}: {amount} {measurement_unit}\n'
+
+
+def shopping_list_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(('Ингредиент', 'Количество', 'Единица измерения'))
+    for name, measurement_unit, amount in rows:
+        yield writer.writerow((name, amount, measurement_unit))
+
+
+def shopping_list_json(rows):
+    separator = '['
+    for name, measurement_unit, amount in rows:
+        yield separator + json.dumps(
+            {'name': name, 'amount': amount,
+             'measurement_unit': measurement_unit},
+            ensure_ascii=False
+        )
+        separator = ','
+    yield '[]' if separator == '[' else ']'
+
+
+RECIPE_DUMP_FIELDS = ('recipe_id', 'recipe', 'author', 'cooking_time',
+                      'ingredient', 'amount', 'measurement_unit')
+
+
+def recipe_dump_rows():
+    return RecipeIngredients.objects.values_list(
+        'recipe_name_id', 'recipe_name__name', 'recipe_name__author__username',
+        'recipe_name__cooking_time', 'name__name', 'amount',
+        'name__measurement_unit'
+    ).order_by('recipe_name_id', 'name__name')
+
+
+def recipe_dump_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(RECIPE_DUMP_FIELDS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def recipe_dump_json(rows):
+    separator = '['
+    for row in rows:
+        yield separator + json.dumps(dict(zip(RECIPE_DUMP_FIELDS, row)),
+                                     ensure_ascii=False)
+        separator = ','
+    yield '[]' if separator == '[' else ']'
+
+
+SHOPPING_LIST_FORMATS = {
+    'txt': shopping_list_txt,
+    'csv': shopping_list_csv,
+    'json': shopping_list_json,
+}
+
+RECIPE_DUMP_FORMATS = {
+    'csv': recipe_dump_csv,
+    'json': recipe_dump_json,
+}
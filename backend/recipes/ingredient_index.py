@@ -0,0 +1,50 @@
+from bisect import bisect_left
+
+from core.versions import VersionedLocalCache
+from .models import Ingredient
+
+SEARCH_LIMIT = 50
+
+
+def normalize(name):
+    return name.casefold().replace('ё', 'е')
+
+
+class IngredientIndex(VersionedLocalCache):
+    model = Ingredient
+
+    def build(self):
+        entries = sorted(
+            ((normalize(ingredient.name), ingredient)
+             for ingredient in Ingredient.objects.all()),
+            key=lambda entry: (entry[0], entry[1].measurement_unit)
+        )
+        ingredients = [ingredient for _, ingredient in entries]
+        return ([key for key, _ in entries], ingredients,
+                {ingredient.id: ingredient for ingredient in ingredients})
+
+    def all(self):
+        _, ingredients, _ = self._load()
+        return list(ingredients)
+
+    def get_many(self, ids):
+        _, _, by_id = self._load()
+        return [by_id[pk] for pk in ids if pk in by_id]
+
+    def search(self, query, limit=SEARCH_LIMIT):
+        keys, ingredients, _ = self._load()
+        query = normalize(query)
+        start = bisect_left(keys, query)
+        end = start
+        while end < len(keys) and keys[end].startswith(query):
+            end += 1
+        results = ingredients[start:min(end, start + limit)]
+        if len(results) < limit:
+            results += [
+                ingredient for key, ingredient in zip(keys, ingredients)
+                if query in key and not key.startswith(query)
+            ][:limit - len(results)]
+        return results
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,81 @@
+import hashlib
+import logging
+import tempfile
+
+from django.core.files import File
+from django.db import close_old_connections
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .exports import (RECIPE_DUMP_FORMATS, SHOPPING_LIST_FORMATS,
+                      recipe_dump_rows, shopping_list_rows)
+from .ingredient_index import ingredient_index
+from .models import ExportJob, Recipe, ShoppingCart
+
+logger = logging.getLogger(__name__)
+
+
+def shopping_list_fingerprint(user):
+    return list(ShoppingCart.objects.filter(user=user).order_by(
+        'recipe_id').values_list('recipe_id', 'recipe__updated_at'))
+
+
+def recipe_dump_fingerprint(user):
+    return Recipe.objects.aggregate(count=Count('pk'), last_id=Max('pk'),
+                                    updated_at=Max('updated_at'))
+
+
+EXPORTS = {
+    ExportJob.SHOPPING_LIST: (SHOPPING_LIST_FORMATS, shopping_list_rows,
+                              shopping_list_fingerprint),
+    ExportJob.RECIPES: (RECIPE_DUMP_FORMATS,
+                        lambda user: recipe_dump_rows(),
+                        recipe_dump_fingerprint),
+}
+
+
+def export_formats(kind):
+    return EXPORTS[kind][0]
+
+
+def input_hash(job):
+    payload = repr((
+        job.kind,
+        job.format,
+        EXPORTS[job.kind][2](job.user),
+        ingredient_index.version(),
+    ))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def write_export(job, rows):
+    formats = EXPORTS[job.kind][0]
+    with tempfile.TemporaryFile() as output:
+        for chunk in formats[job.format](rows.iterator()):
+            output.write(chunk.encode())
+        output.seek(0)
+        job.result.save(f'{job.kind}-{job.input_hash[:16]}.{job.format}',
+                        File(output), save=False)
+
+
+def run_job(job):
+    close_old_connections()
+    try:
+        rows = EXPORTS[job.kind][1](job.user)
+        job.input_hash = input_hash(job)
+        finished = ExportJob.objects.finished_with(job.kind, job.format,
+                                                   job.input_hash)
+        if finished and finished.result.storage.reuse(finished.result.name):
+            job.result = finished.result.name
+        else:
+            write_export(job, rows)
+        job.status = ExportJob.DONE
+    except Exception as error:
+        logger.exception('Export job %s failed', job.pk)
+        job.status = ExportJob.FAILED
+        job.error = str(error)
+    job.finished_at = timezone.now()
+    job.save(update_fields=('input_hash', 'result', 'status', 'error',
+                            'finished_at'))
+    close_old_connections()
+    return job
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from recipes.models import Recipe, User
+from recipes.renditions import get_executor, is_stale, render
+
+RENDITION_SOURCES = ((Recipe, 'image'), (User, 'avatar'))
+
+
+class Command(BaseCommand):
+    help = 'Создание уменьшенных копий картинок рецептов и аватаров.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help='Пересоздать уже существующие копии.')
+
+    def handle(self, *args, **options):
+        executor = get_executor()
+        for model, field_name in RENDITION_SOURCES:
+            instances = model.objects.exclude(
+                **{f'{field_name}__isnull': True}).exclude(
+                **{field_name: ''}).only('pk', field_name, 'renditions')
+            pks = [instance.pk for instance in instances.iterator()
+                   if options['force'] or is_stale(instance, field_name)]
+            results = executor.map(render, [model] * len(pks), pks,
+                                   [field_name] * len(pks))
+            built = sum(result is not None for result in results)
+            self.stdout.write(self.style.SUCCESS(
+                f'{model._meta.verbose_name_plural}: '
+                f'обработано {built} из {len(pks)}.'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from recipes.similarity import TOP_K, similar_recipes
+
+
+class Command(BaseCommand):
+    help = 'Расчёт похожих рецептов по ингредиентам и тегам.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--k', type=int, default=TOP_K,
+                            help='Сколько похожих рецептов хранить.')
+
+    def handle(self, *args, **options):
+        count = similar_recipes.rebuild(options['k'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Похожие рецепты рассчитаны для {count} рецептов '
+            f'в {similar_recipes.path}.'))
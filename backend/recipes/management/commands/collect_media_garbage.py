@@ -0,0 +1,65 @@
+from datetime import timedelta
+import os
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from recipes.storage import reference_counts, stored_files
+
+MEDIA_DIRECTORIES = ('recipes/images', 'images/avatars', 'exports')
+
+
+def walk(storage, directory):
+    if not storage.exists(directory):
+        return
+    subdirectories, files = storage.listdir(directory)
+    for name in files:
+        yield os.path.join(directory, name)
+    for subdirectory in subdirectories:
+        yield from walk(storage, os.path.join(directory, subdirectory))
+
+
+class Command(BaseCommand):
+    help = ('Сверка счётчиков ссылок на файлы и удаление файлов, '
+            'на которые не ссылается ни одна запись.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Только показать файлы без удаления.')
+        parser.add_argument('--grace', type=int, default=3600,
+                            help='Не трогать файлы моложе стольких секунд.')
+
+    def reconcile(self, counts, threshold, dry_run):
+        fixed = 0
+        stored = stored_files().filter(updated_at__lt=threshold)
+        for name, references, updated_at in stored.values_list(
+                'name', 'references', 'updated_at').iterator():
+            actual = counts.get(name, 0)
+            if references == actual:
+                continue
+            fixed += 1
+            if not dry_run:
+                stored_files().filter(
+                    name=name, updated_at=updated_at
+                ).update(references=actual)
+        return fixed
+
+    def handle(self, *args, **options):
+        threshold = timezone.now() - timedelta(seconds=options['grace'])
+        counts = reference_counts()
+        fixed = self.reconcile(counts, threshold, options['dry_run'])
+        removed = 0
+        for directory in MEDIA_DIRECTORIES:
+            for name in walk(default_storage, directory):
+                if counts.get(name):
+                    continue
+                if default_storage.get_modified_time(name) > threshold:
+                    continue
+                if options['dry_run']:
+                    removed += 1
+                    self.stdout.write(name)
+                elif default_storage.collect(name):
+                    removed += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено счётчиков: {fixed}. Файлов без ссылок: {removed}.'))
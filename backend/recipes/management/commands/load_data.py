@@ -4,7 +4,9 @@ import os
 from django.conf import settings
 from django.core.management.base import BaseCommand
 
+from recipes.ingredient_index import ingredient_index
 from recipes.models import Ingredient, Tag
+from recipes.tag_registry import tag_registry
 
 DATA_ROOT = os.path.join(settings.BASE_DIR, "data/ingredients.csv")
 
@@ -32,6 +34,7 @@ def create_default_tags():
     ]
 
     Tag.objects.bulk_create(tags_to_create)
+    tag_registry.invalidate()
     return tags_to_create
 
 
@@ -41,6 +44,7 @@ class Command(BaseCommand):
     def handle(self, *args, **kwargs):
         ingredients = load_ingredients_from_csv(DATA_ROOT)
         Ingredient.objects.bulk_create(ingredients)
+        ingredient_index.invalidate()
         self.stdout.write(self.style.SUCCESS(
             "Ингредиенты загружены в БД."))
 
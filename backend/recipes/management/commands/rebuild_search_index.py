@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from recipes.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Пересоздание поискового индекса рецептов.'
+
+    def handle(self, *args, **kwargs):
+        rebuild_index()
+        self.stdout.write(self.style.SUCCESS('Поисковый индекс обновлён.'))
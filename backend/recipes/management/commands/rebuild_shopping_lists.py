@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Sum
+
+from recipes.models import RecipeIngredients, ShoppingListItem
+
+
+def expected_totals():
+    return {
+        (user_id, ingredient_id): total
+        for user_id, ingredient_id, total in RecipeIngredients.objects.filter(
+            recipe_name__shoppingcart__isnull=False
+        ).values_list(
+            'recipe_name__shoppingcart__user', 'name'
+        ).annotate(total=Sum('amount')).order_by().iterator()
+    }
+
+
+def stored_totals():
+    return {
+        (user_id, ingredient_id): amount
+        for user_id, ingredient_id, amount in ShoppingListItem.objects.
+        values_list('user_id', 'ingredient_id', 'amount').iterator()
+    }
+
+
+class Command(BaseCommand):
+    help = 'Пересчёт списков покупок по корзинам пользователей.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify', action='store_true',
+            help='Только сравнить сохранённые списки с корзинами.'
+        )
+
+    def handle(self, *args, **options):
+        if options['verify']:
+            expected = expected_totals()
+            stored = stored_totals()
+            mismatched = {
+                key for key in expected.keys() | stored.keys()
+                if expected.get(key) != stored.get(key)
+            }
+            if mismatched:
+                raise CommandError(
+                    f'Расхождений в списках покупок: {len(mismatched)}.')
+            self.stdout.write(self.style.SUCCESS(
+                f'Списки покупок совпадают: {len(stored)} позиций.'))
+            return
+        with transaction.atomic():
+            ShoppingListItem.objects.all().delete()
+            ShoppingListItem.objects.bulk_create(
+                (ShoppingListItem(user_id=user_id,
+                                  ingredient_id=ingredient_id, amount=total)
+                 for (user_id, ingredient_id), total
+                 in expected_totals().items()),
+                batch_size=1000
+            )
+        self.stdout.write(self.style.SUCCESS('Списки покупок пересчитаны.'))
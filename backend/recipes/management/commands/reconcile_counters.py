@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.counters import counters, drifted_ids, reconcile
+
+
+class Command(BaseCommand):
+    help = 'Пересчёт счётчиков избранного, покупок, рецептов и подписчиков.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify', action='store_true',
+            help='Только найти расхождения, не исправляя их.'
+        )
+
+    def handle(self, *args, **options):
+        if options['verify']:
+            drift = {
+                f'{model._meta.label}.{counter_name}':
+                    len(drifted_ids(model, counter_name, expected))
+                for model, counter_name, expected in counters()
+            }
+            for name, count in drift.items():
+                self.stdout.write(f'{name}: {count}')
+            if any(drift.values()):
+                raise CommandError(
+                    f'Расхождений в счётчиках: {sum(drift.values())}.')
+            self.stdout.write(self.style.SUCCESS('Счётчики совпадают.'))
+            return
+        with transaction.atomic():
+            fixed = reconcile()
+        for name, count in fixed.items():
+            self.stdout.write(f'{name}: исправлено {count}')
+        self.stdout.write(self.style.SUCCESS('Счётчики пересчитаны.'))
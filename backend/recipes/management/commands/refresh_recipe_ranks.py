@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes.ranking import refresh_ranks
+
+
+class Command(BaseCommand):
+    help = 'Пересчёт рейтингов популярности и трендов рецептов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Повторять пересчёт с этой паузой, сек. '
+                                 'По умолчанию выполняется один раз.')
+
+    def handle(self, *args, **options):
+        while True:
+            created, changed = refresh_ranks()
+            self.stdout.write(
+                f'Рейтинги обновлены: новых {created}, изменено {changed}.')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,45 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes.jobs import run_job
+from recipes.models import ExportJob
+
+
+class Command(BaseCommand):
+    help = 'Обработка очереди выгрузок в пуле потоков.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2,
+                            help='Количество потоков.')
+        parser.add_argument('--interval', type=float, default=2,
+                            help='Пауза между опросами очереди, сек.')
+        parser.add_argument('--stale-after', type=int, default=3600,
+                            help='Через сколько секунд зависшая выгрузка '
+                                 'снова попадает в очередь.')
+        parser.add_argument('--once', action='store_true',
+                            help='Выйти, когда очередь опустеет.')
+
+    def handle(self, *args, **options):
+        stale_after = timedelta(seconds=options['stale_after'])
+        running = set()
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            while True:
+                while len(running) < options['workers']:
+                    job = ExportJob.objects.claim(stale_after)
+                    if job is None:
+                        break
+                    running.add(executor.submit(run_job, job))
+                if not running:
+                    if options['once']:
+                        break
+                    time.sleep(options['interval'])
+                    continue
+                done, running = wait(running, timeout=options['interval'],
+                                     return_when=FIRST_COMPLETED)
+                for future in done:
+                    job = future.result()
+                    self.stdout.write(
+                        f'Выгрузка {job.pk}: {job.get_status_display()}')
@@ -0,0 +1,63 @@
+from django.db import migrations
+
+SEARCH_SQL = {
+    'postgresql': (
+        'CREATE TABLE recipes_recipesearch ('
+        'recipe_id bigint PRIMARY KEY '
+        'REFERENCES recipes_recipe (id) ON DELETE CASCADE '
+        'DEFERRABLE INITIALLY DEFERRED, '
+        'document tsvector NOT NULL)',
+        'CREATE INDEX recipes_recipesearch_document ON recipes_recipesearch '
+        'USING gin (document)',
+        'INSERT INTO recipes_recipesearch (recipe_id, document) '
+        'SELECT recipe.id, '
+        "setweight(to_tsvector('russian', "
+        "replace(replace(recipe.name, 'ё', 'е'), 'Ё', 'Е')), 'A') || "
+        "setweight(to_tsvector('russian', coalesce("
+        "replace(replace(string_agg(ingredient.name, ' '), 'ё', 'е'), "
+        "'Ё', 'Е'), '')), 'B') || "
+        "setweight(to_tsvector('russian', "
+        "replace(replace(recipe.text, 'ё', 'е'), 'Ё', 'Е')), 'C') "
+        'FROM recipes_recipe recipe '
+        'LEFT JOIN recipes_recipeingredients link '
+        'ON link.recipe_name_id = recipe.id '
+        'LEFT JOIN recipes_ingredient ingredient '
+        'ON ingredient.id = link.name_id '
+        'GROUP BY recipe.id',
+    ),
+    'sqlite': (
+        'CREATE VIRTUAL TABLE recipes_recipesearch USING fts5('
+        "name, ingredients, text, tokenize='unicode61 remove_diacritics 2')",
+        'INSERT INTO recipes_recipesearch (rowid, name, ingredients, text) '
+        "SELECT recipe.id, replace(replace(recipe.name, 'ё', 'е'), 'Ё', 'Е'), "
+        "coalesce(replace(replace(group_concat(ingredient.name, ' '), "
+        "'ё', 'е'), 'Ё', 'Е'), ''), "
+        "replace(replace(recipe.text, 'ё', 'е'), 'Ё', 'Е') "
+        'FROM recipes_recipe recipe '
+        'LEFT JOIN recipes_recipeingredients link '
+        'ON link.recipe_name_id = recipe.id '
+        'LEFT JOIN recipes_ingredient ingredient '
+        'ON ingredient.id = link.name_id '
+        'GROUP BY recipe.id',
+    ),
+}
+
+
+def create_search_index(apps, schema_editor):
+    for sql in SEARCH_SQL[schema_editor.connection.vendor]:
+        schema_editor.execute(sql, params=None)
+
+
+def drop_search_index(apps, schema_editor):
+    schema_editor.execute('DROP TABLE IF EXISTS recipes_recipesearch')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_renditions'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 3.2.3 on 2026-10-18 19:46
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+COUNTERS = (
+    ('recipes.Recipe', 'favorites_count', 'recipes.Favorite', 'recipe'),
+    ('recipes.Recipe', 'in_carts_count', 'recipes.ShoppingCart', 'recipe'),
+    ('users.CustomUser', 'recipes_count', 'recipes.Recipe', 'author'),
+    ('users.CustomUser', 'followers_count', 'users.Subscription',
+     'subscription'),
+)
+
+
+def fill_counters(apps, schema_editor):
+    for label, counter_name, source_label, field_name in COUNTERS:
+        source = apps.get_model(source_label)
+        apps.get_model(label).objects.update(**{counter_name: Coalesce(
+            Subquery(source.objects.filter(**{field_name: OuterRef('pk')})
+                     .order_by().values(field_name)
+                     .annotate(total=Count('pk')).values('total')),
+            0
+        )})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_feedentry'),
+        ('users', '0003_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В избранном'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='in_carts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В покупках'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 3.2.3 on 2026-10-18 19:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def backdate_added_at(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    created_at = models.Subquery(Recipe.objects.filter(
+        pk=models.OuterRef('recipe_id')).values('created_at'))
+    for model_name in ('Favorite', 'ShoppingCart'):
+        apps.get_model('recipes', model_name).objects.update(
+            added_at=created_at)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeRank',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rank', serialize=False, to='recipes.recipe', verbose_name='Рецепт')),
+                ('popularity', models.PositiveIntegerField(default=0, verbose_name='Популярность')),
+                ('trending', models.FloatField(default=0, verbose_name='Тренд')),
+            ],
+            options={
+                'verbose_name': 'Рейтинг рецепта',
+                'verbose_name_plural': 'Рейтинги рецептов',
+            },
+        ),
+        migrations.AddField(
+            model_name='favorite',
+            name='added_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Добавлено'),
+        ),
+        migrations.AddField(
+            model_name='shoppingcart',
+            name='added_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Добавлено'),
+        ),
+        migrations.AddIndex(
+            model_name='reciperank',
+            index=models.Index(fields=['-popularity'], name='rank_popularity_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reciperank',
+            index=models.Index(fields=['-trending'], name='rank_trending_idx'),
+        ),
+        migrations.RunPython(backdate_added_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 3.2.3 on 2026-10-18 20:22
+
+from collections import Counter
+
+from django.db import migrations, models
+import django.utils.timezone
+
+MEDIA_REFERENCES = (
+    ('recipes.Recipe', 'image', False),
+    ('recipes.Recipe', 'renditions', True),
+    ('users.CustomUser', 'avatar', False),
+    ('users.CustomUser', 'renditions', True),
+    ('recipes.ExportJob', 'result', False),
+)
+SOURCE_KEY = 'source'
+
+
+def fill_stored_files(apps, schema_editor):
+    counts = Counter()
+    for label, field_name, is_json in MEDIA_REFERENCES:
+        values = apps.get_model(label).objects.values_list(field_name,
+                                                          flat=True)
+        for value in values.iterator():
+            if is_json:
+                counts.update(name for key, name in value.items()
+                              if key != SOURCE_KEY)
+            elif value:
+                counts[value] += 1
+    stored_file = apps.get_model('recipes', 'StoredFile')
+    stored_file.objects.bulk_create(
+        (stored_file(name=name, references=references)
+         for name, references in counts.items()),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_access_path_indexes'),
+        ('users', '0003_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredFile',
+            fields=[
+                ('name', models.CharField(max_length=255, primary_key=True, serialize=False, verbose_name='Файл')),
+                ('references', models.PositiveIntegerField(default=0, verbose_name='Ссылок')),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Изменено')),
+            ],
+            options={
+                'verbose_name': 'Файл',
+                'verbose_name_plural': 'Файлы',
+            },
+        ),
+        migrations.RunPython(fill_stored_files, migrations.RunPython.noop),
+    ]
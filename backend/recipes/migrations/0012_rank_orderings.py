@@ -0,0 +1,44 @@
+# Generated by Django 3.2.3 on 2026-10-18 20:44
+
+from django.db import migrations, models
+
+
+def create_missing_ranks(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    RecipeRank = apps.get_model('recipes', 'RecipeRank')
+    RecipeRank.objects.bulk_create(
+        (RecipeRank(recipe_id=recipe_id) for recipe_id
+         in Recipe.objects.filter(rank__isnull=True).values_list(
+             'id', flat=True).iterator()),
+        batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_storedfile'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='reciperank',
+            name='rank_popularity_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='reciperank',
+            name='rank_trending_idx',
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['cooking_time', '-created_at', '-id'], name='recipe_cooking_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reciperank',
+            index=models.Index(fields=['-popularity', '-recipe'], name='rank_popularity_recipe_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reciperank',
+            index=models.Index(fields=['-trending', '-recipe'], name='rank_trending_recipe_idx'),
+        ),
+        migrations.RunPython(create_missing_ranks, migrations.RunPython.noop),
+    ]
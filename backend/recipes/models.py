@@ -1,7 +1,17 @@
+from collections import defaultdict
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
-from django.db.models import Exists, OuterRef
+from django.db import connections, models, transaction
+from django.db.models import (Case, Exists, F, OuterRef, Prefetch, Subquery,
+                              Sum, Value, When, Window)
+from django.db.models.functions import Greatest, RowNumber
+from django.utils import timezone
+
+from core.models import PreservedFieldsMixin, UniquePairMixin
+from core.querysets import MergedQuerySet, UniquePairQuerySet
+from users.models import Subscription
 
 MAX_LEN = 40
 
@@ -39,11 +49,78 @@ class Ingredient(models.Model):
         return self.name[:MAX_LEN]
 
 
-class ShoppingCart(models.Model):
+class UserRecipeQuerySet(UniquePairQuerySet):
+    @transaction.atomic
+    def add_recipes(self, user, recipe_ids):
+        recipe_ids = list(dict.fromkeys(recipe_ids))
+        found_ids = set(Recipe.objects.filter(id__in=recipe_ids)
+                        .values_list('id', flat=True))
+        added_ids = set(self.insert_ignore(
+            [{'user_id': user.id, 'recipe_id': pk}
+             for pk in recipe_ids if pk in found_ids],
+            returning='recipe'
+        ))
+        self.pairs_added([(user.id, pk) for pk in added_ids])
+        return {
+            'added': [pk for pk in recipe_ids if pk in added_ids],
+            'skipped': [pk for pk in recipe_ids
+                        if pk in found_ids and pk not in added_ids],
+            'missing': [pk for pk in recipe_ids if pk not in found_ids],
+        }
+
+    @transaction.atomic
+    def remove_recipes(self, user, recipe_ids):
+        recipe_ids = list(dict.fromkeys(recipe_ids))
+        user_recipes = self.filter(user=user, recipe_id__in=recipe_ids)
+        existing_ids = set(user_recipes.select_for_update().values_list(
+            'recipe_id', flat=True))
+        user_recipes.delete()
+        found_ids = existing_ids | set(
+            Recipe.objects.filter(id__in=set(recipe_ids) - existing_ids)
+            .values_list('id', flat=True))
+        return {
+            'removed': [pk for pk in recipe_ids if pk in existing_ids],
+            'skipped': [pk for pk in recipe_ids
+                        if pk in found_ids and pk not in existing_ids],
+            'missing': [pk for pk in recipe_ids if pk not in found_ids],
+        }
+
+
+class FavoriteQuerySet(UserRecipeQuerySet):
+    counter = ('recipe', 'favorites_count')
+
+
+class ShoppingCartQuerySet(UserRecipeQuerySet):
+    counter = ('recipe', 'in_carts_count')
+
+    def _by_user(self, pairs):
+        recipe_ids = defaultdict(list)
+        for user_id, recipe_id in pairs:
+            recipe_ids[user_id].append(recipe_id)
+        return recipe_ids.items()
+
+    def pairs_added(self, pairs):
+        super().pairs_added(pairs)
+        for user_id, recipe_ids in self._by_user(pairs):
+            ShoppingListItem.objects.add_recipes(user_id, recipe_ids)
+
+    def pairs_removed(self, pairs):
+        super().pairs_removed(pairs)
+        for user_id, recipe_ids in self._by_user(pairs):
+            ShoppingListItem.objects.remove_recipes([user_id], recipe_ids)
+
+    def clear(self, user):
+        self.filter(user=user).delete()
+
+
+class ShoppingCart(UniquePairMixin, models.Model):
     recipe = models.ForeignKey(to='Recipe', on_delete=models.CASCADE,
                                verbose_name='Рецепт')
     user = models.ForeignKey(to=User, on_delete=models.CASCADE,
                              verbose_name='Пользователь')
+    added_at = models.DateTimeField(default=timezone.now, db_index=True,
+                                    verbose_name='Добавлено')
+    objects = ShoppingCartQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Рецепт в покупках'
@@ -55,16 +132,19 @@ class ShoppingCart(models.Model):
 
     def __str__(self):
         return (
-            f'{self.recipe[:MAX_LEN]} добавлен в покупки '
-            f'{self.user[:MAX_LEN]}'
+            f'{str(self.recipe)[:MAX_LEN]} добавлен в покупки '
+            f'{str(self.user)[:MAX_LEN]}'
         )
 
 
-class Favorite(models.Model):
+class Favorite(UniquePairMixin, models.Model):
     recipe = models.ForeignKey(to='Recipe', on_delete=models.CASCADE,
                                verbose_name='Рецепт')
     user = models.ForeignKey(to=User, on_delete=models.CASCADE,
                              verbose_name='Пользователь')
+    added_at = models.DateTimeField(default=timezone.now, db_index=True,
+                                    verbose_name='Добавлено')
+    objects = FavoriteQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Рецепт в избранном'
@@ -75,7 +155,8 @@ class Favorite(models.Model):
                                     name='unique_recipe_user_favor')]
 
     def __str__(self):
-        return f'{self.recipe[:MAX_LEN]} добавлен {self.user[:MAX_LEN]}'
+        return (f'{str(self.recipe)[:MAX_LEN]} добавлен '
+                f'{str(self.user)[:MAX_LEN]}')
 
 
 class RecipeQuerySet(models.QuerySet):
@@ -85,8 +166,31 @@ class RecipeQuerySet(models.QuerySet):
             is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
                 recipe=OuterRef('id'), user=user,)))
 
+    def related_lookups(self):
+        return (
+            'tags',
+            Prefetch('recipeingredients',
+                     queryset=RecipeIngredients.objects.select_related('name'))
+        )
+
+    def latest_for_authors(self, author_ids, limit=None):
+        recipes = self.filter(author_id__in=author_ids)
+        if not limit:
+            return recipes
+        ranked = recipes.order_by().annotate(position=Window(
+            expression=RowNumber(),
+            partition_by=F('author_id'),
+            order_by=(F('created_at').desc(), F('id').desc()),
+        ))
+        sql, params = ranked.query.sql_with_params()
+        return self.model.objects.raw(
+            f'SELECT * FROM ({sql}) ranked WHERE position <= %s '
+            f'ORDER BY author_id, position',
+            (*params, limit)
+        )
+
 
-class Recipe(models.Model):
+class Recipe(PreservedFieldsMixin, models.Model):
     name = models.CharField(max_length=150, verbose_name='Название')
     image = models.ImageField(null=True, upload_to='recipes/images/',
                               default=None, verbose_name='Картинка')
@@ -102,6 +206,13 @@ class Recipe(models.Model):
 
     created_at = models.DateTimeField(verbose_name='Добавлено',
                                       auto_now_add=True)
+    updated_at = models.DateTimeField(verbose_name='Изменено', auto_now=True)
+    renditions = models.JSONField(default=dict, blank=True, editable=False,
+                                  verbose_name='Уменьшенные копии')
+    favorites_count = models.PositiveIntegerField(default=0, editable=False,
+                                                  verbose_name='В избранном')
+    in_carts_count = models.PositiveIntegerField(default=0, editable=False,
+                                                 verbose_name='В покупках')
     author = models.ForeignKey(to=User, verbose_name='Автор',
                                on_delete=models.CASCADE)
     ingredients = models.ManyToManyField(blank=False, to=Ingredient,
@@ -109,17 +220,58 @@ class Recipe(models.Model):
                                          verbose_name='Ингредиенты')
     tags = models.ManyToManyField(Tag, verbose_name='Теги')
     objects = RecipeQuerySet.as_manager()
+    preserved_fields = ('renditions', 'favorites_count', 'in_carts_count')
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         default_related_name = 'recipes'
         ordering = ('-created_at',)
+        indexes = [
+            models.Index(fields=['-created_at', '-id'],
+                         name='recipe_created_idx'),
+            models.Index(fields=['author', '-created_at', '-id'],
+                         name='recipe_author_created_idx'),
+            models.Index(fields=['cooking_time', '-created_at', '-id'],
+                         name='recipe_cooking_time_idx'),
+        ]
 
     def __str__(self):
         return self.name[:MAX_LEN]
 
 
+class RecipeRank(models.Model):
+    recipe = models.OneToOneField(to=Recipe, on_delete=models.CASCADE,
+                                  primary_key=True, related_name='rank',
+                                  verbose_name='Рецепт')
+    popularity = models.PositiveIntegerField(default=0,
+                                             verbose_name='Популярность')
+    trending = models.FloatField(default=0, verbose_name='Тренд')
+
+    class Meta:
+        verbose_name = 'Рейтинг рецепта'
+        verbose_name_plural = 'Рейтинги рецептов'
+        indexes = [
+            models.Index(fields=['-popularity', '-recipe'],
+                         name='rank_popularity_recipe_idx'),
+            models.Index(fields=['-trending', '-recipe'],
+                         name='rank_trending_recipe_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe_id}: {self.popularity} / {self.trending:.2f}'
+
+
+class RecipeIngredientsQuerySet(models.QuerySet):
+    def amounts(self, recipe_ids):
+        amounts = {recipe_id: {} for recipe_id in recipe_ids}
+        for recipe_id, ingredient_id, amount in self.filter(
+                recipe_name_id__in=amounts).values_list(
+                'recipe_name_id', 'name_id', 'amount'):
+            amounts[recipe_id][ingredient_id] = amount
+        return amounts
+
+
 class RecipeIngredients(models.Model):
     recipe_name = models.ForeignKey(to=Recipe, on_delete=models.CASCADE,
                                     verbose_name='Рецепт')
@@ -133,6 +285,7 @@ class RecipeIngredients(models.Model):
             MaxValueValidator(limit_value=1000,
                               message='Максимальное кол-во 1000')]
     )
+    objects = RecipeIngredientsQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Ингредиент в рецепте'
@@ -142,9 +295,293 @@ class RecipeIngredients(models.Model):
             models.UniqueConstraint(fields=['recipe_name', 'name'],
                                     name='unique_ingredient_in_recipe')
         ]
+        indexes = [
+            models.Index(fields=['recipe_name', 'name', 'amount'],
+                         name='recipe_ingredients_cover_idx'),
+        ]
 
     def __str__(self):
         return (
-            f'{self.name[:MAX_LEN]} для '
-            f'рецепта {self.recipe_name[:MAX_LEN]}'
+            f'{str(self.name)[:MAX_LEN]} для '
+            f'рецепта {str(self.recipe_name)[:MAX_LEN]}'
+        )
+
+
+class ShoppingListQuerySet(models.QuerySet):
+    def _upsert(self, select_sql, params):
+        table = self.model._meta.db_table
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} (user_id, ingredient_id, amount) '
+                f'{select_sql} ON CONFLICT (user_id, ingredient_id) '
+                f'DO UPDATE SET amount = {table}.amount + EXCLUDED.amount',
+                params
+            )
+
+    def _subtract(self, items, amount):
+        items.update(amount=Greatest(F('amount') - amount, 0))
+        items.filter(amount=0).delete()
+
+    def add_recipes(self, user_id, recipe_ids):
+        if not recipe_ids:
+            return
+        placeholders = ', '.join(['%s'] * len(recipe_ids))
+        self._upsert(
+            f'SELECT %s, name_id, SUM(amount) '
+            f'FROM {RecipeIngredients._meta.db_table} '
+            f'WHERE recipe_name_id IN ({placeholders}) GROUP BY name_id',
+            [user_id, *recipe_ids]
+        )
+
+    def remove_recipes(self, user_ids, recipe_ids):
+        if not recipe_ids:
+            return
+        ingredients = RecipeIngredients.objects.filter(
+            recipe_name__in=recipe_ids)
+        self._subtract(
+            self.filter(user_id__in=user_ids,
+                        ingredient__in=ingredients.values('name')),
+            Subquery(ingredients.filter(name=OuterRef('ingredient')).values(
+                'name').annotate(total=Sum('amount')).values('total'))
+        )
+
+    def apply_recipe_changes(self, recipe_id, deltas):
+        user_ids = ShoppingCart.objects.filter(
+            recipe_id=recipe_id).values('user_id')
+        increments = [(pk, delta) for pk, delta in deltas.items() if delta > 0]
+        if increments:
+            values = ', '.join(['(%s, %s)'] * len(increments))
+            self._upsert(
+                f'SELECT cart.user_id, delta.column1, delta.column2 '
+                f'FROM {ShoppingCart._meta.db_table} cart, '
+                f'(VALUES {values}) delta WHERE cart.recipe_id = %s',
+                [*(value for pair in increments for value in pair),
+                 recipe_id]
+            )
+        decrements = {pk: -delta for pk, delta in deltas.items() if delta < 0}
+        if decrements:
+            self._subtract(
+                self.filter(user_id__in=user_ids,
+                            ingredient_id__in=decrements),
+                Case(*(When(ingredient_id=pk, then=Value(amount))
+                       for pk, amount in decrements.items()),
+                     output_field=models.PositiveIntegerField())
+            )
+
+
+class ShoppingListItem(models.Model):
+    user = models.ForeignKey(to=User, on_delete=models.CASCADE,
+                             verbose_name='Пользователь')
+    ingredient = models.ForeignKey(to=Ingredient, on_delete=models.CASCADE,
+                                   verbose_name='Ингредиент')
+    amount = models.PositiveIntegerField(verbose_name='Количество')
+    objects = ShoppingListQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Позиция списка покупок'
+        verbose_name_plural = 'Списки покупок'
+        default_related_name = 'shoppinglist'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'ingredient'],
+                                    name='unique_shopping_list_ingredient')
+        ]
+
+    def __str__(self):
+        return f'{self.ingredient.name[:MAX_LEN]}: {self.amount}'
+
+
+class ExportJobQuerySet(models.QuerySet):
+    def enqueue(self, user, kind, format):
+        job = self.filter(user=user, kind=kind, format=format,
+                          status__in=(ExportJob.PENDING,
+                                      ExportJob.RUNNING)).first()
+        return job or self.create(user=user, kind=kind, format=format)
+
+    def claim(self, stale_after):
+        now = timezone.now()
+        claimable = self.filter(
+            models.Q(status=ExportJob.PENDING)
+            | models.Q(status=ExportJob.RUNNING,
+                       started_at__lt=now - stale_after)
         )
+        candidates = claimable.order_by('created_at').values_list('pk',
+                                                                  flat=True)
+        for pk in candidates:
+            if claimable.filter(pk=pk).update(status=ExportJob.RUNNING,
+                                              started_at=now):
+                return self.select_related('user').get(pk=pk)
+        return None
+
+    def finished_with(self, kind, format, input_hash):
+        return self.filter(kind=kind, format=format, input_hash=input_hash,
+                           status=ExportJob.DONE).exclude(result='').first()
+
+
+class ExportJob(models.Model):
+    SHOPPING_LIST = 'shopping_list'
+    RECIPES = 'recipes'
+    KINDS = (
+        (SHOPPING_LIST, 'Список покупок'),
+        (RECIPES, 'Рецепты'),
+    )
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Готово'),
+        (FAILED, 'Ошибка'),
+    )
+
+    user = models.ForeignKey(to=User, on_delete=models.CASCADE,
+                             verbose_name='Пользователь')
+    kind = models.CharField(max_length=32, choices=KINDS,
+                            verbose_name='Тип выгрузки')
+    format = models.CharField(max_length=8, verbose_name='Формат')
+    status = models.CharField(max_length=16, choices=STATUSES,
+                              default=PENDING, db_index=True,
+                              verbose_name='Статус')
+    input_hash = models.CharField(max_length=64, blank=True, db_index=True,
+                                  verbose_name='Хеш исходных данных')
+    result = models.FileField(upload_to='exports/', blank=True,
+                              verbose_name='Файл')
+    error = models.TextField(blank=True, verbose_name='Ошибка')
+    created_at = models.DateTimeField(verbose_name='Создано',
+                                      auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True,
+                                      verbose_name='Запущено')
+    finished_at = models.DateTimeField(null=True, blank=True,
+                                       verbose_name='Завершено')
+    objects = ExportJobQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Выгрузка'
+        verbose_name_plural = 'Выгрузки'
+        default_related_name = 'export_jobs'
+        ordering = ('-created_at',)
+
+    def __str__(self):
+        return f'{self.get_kind_display()} ({self.format}) для {self.user}'
+
+
+class StoredFile(models.Model):
+    name = models.CharField(max_length=255, primary_key=True,
+                            verbose_name='Файл')
+    references = models.PositiveIntegerField(default=0,
+                                             verbose_name='Ссылок')
+    updated_at = models.DateTimeField(default=timezone.now,
+                                      verbose_name='Изменено')
+
+    class Meta:
+        verbose_name = 'Файл'
+        verbose_name_plural = 'Файлы'
+
+    def __str__(self):
+        return f'{self.name} ({self.references})'
+
+
+def is_celebrity(author_id):
+    return User.objects.filter(
+        pk=author_id, followers_count__gt=settings.FEED_FANOUT_LIMIT
+    ).exists()
+
+
+class FeedEntryQuerySet(models.QuerySet):
+    def _entries(self, user_ids, recipes):
+        return [
+            self.model(user_id=user_id, recipe_id=recipe_id,
+                       author_id=author_id, created_at=created_at)
+            for user_id in user_ids
+            for recipe_id, author_id, created_at in recipes
+        ]
+
+    def _latest_recipes(self, author_id, since=None):
+        recipes = Recipe.objects.filter(author_id=author_id)
+        if since is not None:
+            recipes = recipes.filter(created_at__gte=since)
+        return recipes.order_by('-created_at', '-id').values_list(
+            'id', 'author_id', 'created_at')[:settings.FEED_BACKFILL_SIZE]
+
+    def fan_out(self, recipe):
+        if is_celebrity(recipe.author_id):
+            return
+        followers = Subscription.objects.filter(
+            subscription_id=recipe.author_id
+        ).values_list('user_id', flat=True)
+        self.bulk_create(
+            self._entries(followers.iterator(), [
+                (recipe.id, recipe.author_id, recipe.created_at)]),
+            batch_size=1000, ignore_conflicts=True
+        )
+
+    def follow(self, user_id, author_id):
+        if is_celebrity(author_id):
+            return
+        self.bulk_create(
+            self._entries([user_id], self._latest_recipes(author_id)),
+            ignore_conflicts=True
+        )
+
+    def unfollow(self, user_id, author_id):
+        self.filter(user_id=user_id, author_id=author_id).delete()
+
+    def backfill_followers(self, author_id):
+        followers = Subscription.objects.filter(
+            subscription_id=author_id
+        ).values_list('user_id', flat=True)
+        self.bulk_create(
+            self._entries(followers.iterator(),
+                          list(self._latest_recipes(author_id))),
+            batch_size=1000, ignore_conflicts=True
+        )
+
+    def for_user(self, user, recipes=None):
+        celebrity_ids = list(Subscription.objects.filter(
+            user=user,
+            subscription__followers_count__gt=settings.FEED_FANOUT_LIMIT
+        ).values_list('subscription_id', flat=True))
+        entries = self.filter(user=user)
+        if recipes is not None:
+            entries = entries.filter(recipe_id__in=recipes.values('pk'))
+        if not celebrity_ids:
+            return MergedQuerySet(entries.values('recipe_id', 'created_at'))
+        if recipes is None:
+            recipes = Recipe.objects.all()
+        return MergedQuerySet(
+            entries.exclude(author_id__in=celebrity_ids).values(
+                'recipe_id', 'created_at'),
+            recipes.filter(author_id__in=celebrity_ids).values(
+                'created_at', recipe_id=F('id')),
+        )
+
+
+class FeedEntry(models.Model):
+    user = models.ForeignKey(to=User, on_delete=models.CASCADE,
+                             related_name='feed_entries',
+                             verbose_name='Подписчик')
+    recipe = models.ForeignKey(to=Recipe, on_delete=models.CASCADE,
+                               related_name='feed_entries',
+                               verbose_name='Рецепт')
+    author = models.ForeignKey(to=User, on_delete=models.CASCADE,
+                               related_name='+', verbose_name='Автор')
+    created_at = models.DateTimeField(verbose_name='Опубликовано')
+    objects = FeedEntryQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Лента подписок'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'recipe'],
+                                    name='unique_feed_entry')
+        ]
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-recipe'],
+                         name='feed_user_created_idx'),
+            models.Index(fields=['user', 'author', '-created_at'],
+                         name='feed_user_author_created_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe.name[:MAX_LEN]} для {self.user}'
@@ -0,0 +1,45 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Favorite, Recipe, RecipeRank, ShoppingCart
+
+RANK_FIELDS = ('popularity', 'trending')
+
+
+def trending_scores(now):
+    since = now - timedelta(days=settings.TRENDING_WINDOW_DAYS)
+    half_life = timedelta(hours=settings.TRENDING_HALF_LIFE_HOURS)
+    scores = defaultdict(float)
+    for model in (Favorite, ShoppingCart):
+        events = model.objects.filter(added_at__gte=since).values_list(
+            'recipe_id', 'added_at')
+        for recipe_id, added_at in events.iterator():
+            scores[recipe_id] += 0.5 ** ((now - added_at) / half_life)
+    return scores
+
+
+def refresh_ranks(now=None):
+    trending = trending_scores(now or timezone.now())
+    stored = {recipe_id: values for recipe_id, *values
+              in RecipeRank.objects.values_list('recipe_id', *RANK_FIELDS)
+              .iterator()}
+    created, changed = [], []
+    recipes = Recipe.objects.values_list('id', 'favorites_count',
+                                         'in_carts_count').order_by()
+    for recipe_id, favorites, carts in recipes.iterator():
+        values = [favorites + carts, round(trending.get(recipe_id, 0), 4)]
+        current = stored.get(recipe_id)
+        if current == values:
+            continue
+        rank = RecipeRank(recipe_id=recipe_id,
+                          **dict(zip(RANK_FIELDS, values)))
+        (created if current is None else changed).append(rank)
+    with transaction.atomic():
+        RecipeRank.objects.bulk_create(created, batch_size=1000,
+                                       ignore_conflicts=True)
+        RecipeRank.objects.bulk_update(changed, RANK_FIELDS, batch_size=1000)
+    return len(created), len(changed)
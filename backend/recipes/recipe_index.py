@@ -0,0 +1,88 @@
+from collections import Counter
+
+from core.versions import VersionedLocalCache
+from .models import RecipeIngredients
+
+
+class RecipeIngredientIndex(VersionedLocalCache):
+    model = RecipeIngredients
+
+    def build(self):
+        recipes = {}
+        rows = RecipeIngredients.objects.values_list(
+            'recipe_name_id', 'name_id').order_by()
+        for recipe_id, ingredient_id in rows.iterator():
+            recipes.setdefault(recipe_id, set()).add(ingredient_id)
+        postings = {}
+        for recipe_id, ingredient_ids in recipes.items():
+            for ingredient_id in ingredient_ids:
+                postings.setdefault(ingredient_id, set()).add(recipe_id)
+        return ({recipe_id: frozenset(ingredient_ids)
+                 for recipe_id, ingredient_ids in recipes.items()},
+                postings)
+
+    def _unlink(self, recipe_id):
+        recipes, postings = self._data
+        for ingredient_id in recipes.pop(recipe_id, ()):
+            recipe_ids = postings.get(ingredient_id)
+            if recipe_ids is not None:
+                recipe_ids.discard(recipe_id)
+                if not recipe_ids:
+                    del postings[ingredient_id]
+
+    def _link(self, recipe_id, ingredient_ids):
+        self._unlink(recipe_id)
+        recipes, postings = self._data
+        if ingredient_ids:
+            recipes[recipe_id] = frozenset(ingredient_ids)
+        for ingredient_id in ingredient_ids:
+            postings.setdefault(ingredient_id, set()).add(recipe_id)
+
+    def update_recipe(self, recipe_id, ingredient_ids):
+        with self._lock:
+            self._refresh()
+            self._link(recipe_id, ingredient_ids)
+            self._bump()
+
+    def remove_recipes(self, recipe_ids):
+        with self._lock:
+            self._refresh()
+            for recipe_id in recipe_ids:
+                self._unlink(recipe_id)
+            self._bump()
+
+    def refresh_recipes(self, recipe_ids):
+        ingredients = {recipe_id: [] for recipe_id in recipe_ids}
+        rows = RecipeIngredients.objects.filter(
+            recipe_name_id__in=ingredients).values_list(
+            'recipe_name_id', 'name_id')
+        for recipe_id, ingredient_id in rows:
+            ingredients[recipe_id].append(ingredient_id)
+        with self._lock:
+            self._refresh()
+            for recipe_id, ingredient_ids in ingredients.items():
+                self._link(recipe_id, ingredient_ids)
+            self._bump()
+
+    def rank(self, ingredient_ids):
+        with self._lock:
+            self._refresh()
+            recipes, postings = self._data
+            matches = Counter()
+            for ingredient_id in frozenset(ingredient_ids):
+                matches.update(postings.get(ingredient_id, ()))
+            totals = {recipe_id: len(recipes[recipe_id])
+                      for recipe_id in matches}
+        return sorted(
+            ((recipe_id, matched, totals[recipe_id])
+             for recipe_id, matched in matches.items()),
+            key=lambda item: (-item[1] / item[2], item[2] - item[1], -item[0])
+        )
+
+    def missing(self, recipe_id, ingredient_ids):
+        recipes, _ = self._load()
+        return sorted(recipes.get(recipe_id, frozenset())
+                      - frozenset(ingredient_ids))
+
+
+recipe_ingredient_index = RecipeIngredientIndex()
@@ -0,0 +1,128 @@
+from concurrent.futures import ThreadPoolExecutor
+import io
+import logging
+import os
+import threading
+
+from PIL import Image
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.dispatch import Signal
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+RENDITION_SIZES = {
+    'small': 320,
+    'medium': 960,
+}
+SOURCE_KEY = 'source'
+
+renditions_ready = Signal()
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.RENDITION_WORKERS,
+                thread_name_prefix='renditions'
+            )
+        return _executor
+
+
+def _encode(image, format):
+    if format == 'JPEG' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    output = io.BytesIO()
+    image.save(output, format=format, quality=82, optimize=True)
+    return output.getvalue()
+
+
+def build_renditions(field_file):
+    storage = field_file.storage
+    directory, filename = os.path.split(field_file.name)
+    stem = os.path.splitext(filename)[0]
+    with field_file.open('rb') as source, Image.open(source) as image:
+        image.load()
+        has_alpha = 'A' in image.getbands() or 'transparency' in image.info
+        thumbnail_format, extension = (('PNG', 'png') if has_alpha
+                                       else ('JPEG', 'jpg'))
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if has_alpha else 'RGB')
+        renditions = {SOURCE_KEY: field_file.name}
+        for name, size in RENDITION_SIZES.items():
+            resized = image.copy()
+            resized.thumbnail((size, size))
+            for key, format, ext in ((name, thumbnail_format, extension),
+                                     (f'{name}_webp', 'WEBP', 'webp')):
+                renditions[key] = storage.save(
+                    os.path.join(directory, 'renditions',
+                                 f'{stem}-{name}.{ext}'),
+                    ContentFile(_encode(resized, format))
+                )
+    return renditions
+
+
+def delete_renditions(storage, renditions):
+    for key, name in renditions.items():
+        if key != SOURCE_KEY:
+            storage.delete(name)
+
+
+def render(model, pk, field_name):
+    close_old_connections()
+    try:
+        instance = model.objects.only(field_name,
+                                      'renditions').filter(pk=pk).first()
+        field_file = getattr(instance, field_name, None)
+        if not field_file:
+            return None
+        renditions = build_renditions(field_file)
+        values = {'renditions': renditions}
+        if any(field.name == 'updated_at'
+               for field in model._meta.concrete_fields):
+            values['updated_at'] = timezone.now()
+        updated = model.objects.filter(
+            pk=pk, **{field_name: field_file.name}).update(**values)
+        if not updated:
+            delete_renditions(field_file.storage, renditions)
+            return None
+        delete_renditions(field_file.storage, instance.renditions)
+        renditions_ready.send(sender=model, pk=pk, renditions=renditions)
+        return renditions
+    except Exception:
+        logger.exception('Rendition build failed for %s %s',
+                         model._meta.label, pk)
+        return None
+    finally:
+        close_old_connections()
+
+
+def is_stale(instance, field_name):
+    field_file = getattr(instance, field_name)
+    return (field_file.name or None) != instance.renditions.get(SOURCE_KEY)
+
+
+def schedule(instance, field_name):
+    model, pk = type(instance), instance.pk
+    if not getattr(instance, field_name):
+        transaction.on_commit(lambda: clear(model, pk, field_name))
+        return
+    transaction.on_commit(
+        lambda: get_executor().submit(render, model, pk, field_name))
+
+
+def clear(model, pk, field_name):
+    instance = model.objects.only(field_name,
+                                  'renditions').filter(pk=pk).first()
+    if instance is not None and instance.renditions:
+        model.objects.filter(pk=pk).update(renditions={})
+        delete_renditions(getattr(instance, field_name).storage,
+                          instance.renditions)
+        renditions_ready.send(sender=model, pk=pk, renditions={})
@@ -0,0 +1,141 @@
+import re
+
+from django.db import connection, transaction
+from django.db.models import F
+from django.db.models.expressions import RawSQL
+
+SEARCH_TABLE = 'recipes_recipesearch'
+SEARCH_CONFIG = 'russian'
+WORD_RE = re.compile(r'\w+')
+
+
+def fold(expression):
+    return f"replace(replace({expression}, 'ё', 'е'), 'Ё', 'Е')"
+
+
+def fold_query(query):
+    return query.replace('ё', 'е').replace('Ё', 'Е')
+
+
+AGGREGATE_NAMES = {
+    'postgresql': "string_agg(ingredient.name, ' ')",
+    'sqlite': "group_concat(ingredient.name, ' ')",
+}
+
+
+class PostgresSearchBackend:
+    update_sql = (
+        f'INSERT INTO {SEARCH_TABLE} (recipe_id, document) '
+        f"SELECT recipe.id, "
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', "
+        f"{fold('recipe.name')}), 'A') || "
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce("
+        f"{fold(AGGREGATE_NAMES['postgresql'])}, '')), 'B') || "
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', "
+        f"{fold('recipe.text')}), 'C') "
+        f'FROM recipes_recipe recipe '
+        f'LEFT JOIN recipes_recipeingredients link '
+        f'ON link.recipe_name_id = recipe.id '
+        f'LEFT JOIN recipes_ingredient ingredient '
+        f'ON ingredient.id = link.name_id '
+        f'WHERE {{where}} GROUP BY recipe.id '
+        f'ON CONFLICT (recipe_id) DO UPDATE SET document = EXCLUDED.document'
+    )
+    match_sql = (
+        f'SELECT recipe_id FROM {SEARCH_TABLE} '
+        f"WHERE document @@ websearch_to_tsquery('{SEARCH_CONFIG}', %s)"
+    )
+    rank_sql = (
+        f"SELECT ts_rank(document, websearch_to_tsquery('{SEARCH_CONFIG}', "
+        f'%s)) FROM {SEARCH_TABLE} '
+        f'WHERE recipe_id = recipes_recipe.id'
+    )
+
+    def prepare_query(self, query):
+        return fold_query(query).strip()
+
+    def delete(self, cursor, recipe_ids):
+        cursor.execute(
+            f'DELETE FROM {SEARCH_TABLE} WHERE recipe_id = ANY(%s)',
+            [list(recipe_ids)])
+
+
+class SQLiteSearchBackend:
+    update_sql = (
+        f'INSERT INTO {SEARCH_TABLE} (rowid, name, ingredients, text) '
+        f"SELECT recipe.id, {fold('recipe.name')}, "
+        f"coalesce({fold(AGGREGATE_NAMES['sqlite'])}, ''), "
+        f"{fold('recipe.text')} "
+        f'FROM recipes_recipe recipe '
+        f'LEFT JOIN recipes_recipeingredients link '
+        f'ON link.recipe_name_id = recipe.id '
+        f'LEFT JOIN recipes_ingredient ingredient '
+        f'ON ingredient.id = link.name_id '
+        f'WHERE {{where}} GROUP BY recipe.id'
+    )
+    match_sql = (
+        f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s'
+    )
+    rank_sql = (
+        f'SELECT -bm25({SEARCH_TABLE}, 10.0, 4.0, 1.0) FROM {SEARCH_TABLE} '
+        f'WHERE {SEARCH_TABLE} MATCH %s AND rowid = recipes_recipe.id'
+    )
+
+    def prepare_query(self, query):
+        return ' '.join(f'"{word}"*'
+                        for word in WORD_RE.findall(fold_query(query)))
+
+    def delete(self, cursor, recipe_ids):
+        placeholders = ', '.join(['%s'] * len(recipe_ids))
+        cursor.execute(
+            f'DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({placeholders})',
+            list(recipe_ids))
+
+
+BACKENDS = {
+    'postgresql': PostgresSearchBackend,
+    'sqlite': SQLiteSearchBackend,
+}
+
+
+def get_backend():
+    return BACKENDS[connection.vendor]()
+
+
+def rebuild_index():
+    backend = get_backend()
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        cursor.execute(backend.update_sql.format(where='1 = 1'))
+
+
+def update_recipes(recipe_ids):
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids:
+        return
+    backend = get_backend()
+    placeholders = ', '.join(['%s'] * len(recipe_ids))
+    with transaction.atomic(), connection.cursor() as cursor:
+        backend.delete(cursor, recipe_ids)
+        cursor.execute(
+            backend.update_sql.format(where=f'recipe.id IN ({placeholders})'),
+            recipe_ids)
+
+
+def remove_recipes(recipe_ids):
+    recipe_ids = list(recipe_ids)
+    if recipe_ids:
+        with connection.cursor() as cursor:
+            get_backend().delete(cursor, recipe_ids)
+
+
+def search_recipes(queryset, query):
+    backend = get_backend()
+    query = backend.prepare_query(query)
+    if not query:
+        return queryset.none()
+    return queryset.filter(
+        id__in=RawSQL(backend.match_sql, (query,))
+    ).annotate(
+        search_rank=RawSQL(backend.rank_sql, (query,))
+    ).order_by(F('search_rank').desc(), '-created_at', '-id')
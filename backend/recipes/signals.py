@@ -0,0 +1,177 @@
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+
+from core.signals import pairs_added, pairs_removed
+from core.transactions import on_commit_batch
+from users.models import Subscription
+from . import renditions, search
+from .ingredient_index import ingredient_index
+from .models import (ExportJob, Favorite, FeedEntry, Ingredient, Recipe,
+                     RecipeIngredients, RecipeRank, ShoppingCart,
+                     ShoppingListItem, Tag, User)
+from .recipe_index import recipe_ingredient_index
+from .similarity import similar_recipes
+from .tag_registry import tag_registry
+
+RENDITION_FIELDS = {Recipe: 'image', User: 'avatar'}
+SEARCH_FIELDS = {'name', 'text'}
+
+
+@receiver([post_save, post_delete], sender=Ingredient)
+def invalidate_ingredient_index(sender, **kwargs):
+    transaction.on_commit(ingredient_index.invalidate)
+
+
+@receiver([post_save, post_delete], sender=Tag)
+def invalidate_tag_registry(sender, **kwargs):
+    transaction.on_commit(tag_registry.invalidate)
+
+
+@receiver(pre_delete, sender=Recipe)
+def remove_recipe_from_shopping_lists(sender, instance, **kwargs):
+    ShoppingListItem.objects.remove_recipes(
+        ShoppingCart.objects.filter(recipe=instance).values('user_id'),
+        [instance.id]
+    )
+
+
+def count_author_recipes(author_id, step):
+    User.objects.filter(pk=author_id).update(
+        recipes_count=Greatest(F('recipes_count') + step, 0))
+
+
+@receiver(pre_save, sender=Recipe)
+def remember_recipe_author(sender, instance, update_fields=None, **kwargs):
+    instance.stored_author_id = None
+    if not instance._state.adding and (update_fields is None
+                                       or 'author' in update_fields):
+        instance.stored_author_id = Recipe.objects.filter(
+            pk=instance.pk).values_list('author_id', flat=True).first()
+
+
+@receiver(post_save, sender=Recipe)
+def count_created_recipe(sender, instance, created, **kwargs):
+    stored_author_id = getattr(instance, 'stored_author_id', None)
+    if created:
+        count_author_recipes(instance.author_id, 1)
+    elif stored_author_id not in (None, instance.author_id):
+        count_author_recipes(stored_author_id, -1)
+        count_author_recipes(instance.author_id, 1)
+
+
+@receiver(post_save, sender=Recipe)
+def create_recipe_rank(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        RecipeRank.objects.create(recipe=instance)
+
+
+@receiver(post_delete, sender=Recipe)
+def count_deleted_recipe(sender, instance, **kwargs):
+    count_author_recipes(instance.author_id, -1)
+
+
+@receiver(pre_delete, sender=User)
+def release_user_counters(sender, instance, **kwargs):
+    for model in (Favorite, ShoppingCart, Subscription):
+        model.objects.filter(user=instance).delete()
+
+
+@receiver(pairs_added, sender=Subscription)
+def fill_followed_feeds(sender, pairs, **kwargs):
+    for user_id, author_id in pairs:
+        FeedEntry.objects.follow(user_id, author_id)
+
+
+@receiver(pairs_removed, sender=Subscription)
+def clear_unfollowed_feeds(sender, pairs, **kwargs):
+    for user_id, author_id in pairs:
+        FeedEntry.objects.unfollow(user_id, author_id)
+    removed = Counter(author_id for _, author_id in pairs)
+    limit = settings.FEED_FANOUT_LIMIT
+    for author_id, followers_count in User.objects.filter(
+            pk__in=removed).values_list('pk', 'followers_count'):
+        if followers_count <= limit < followers_count + removed[author_id]:
+            FeedEntry.objects.backfill_followers(author_id)
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=User)
+def release_media(sender, instance, **kwargs):
+    field_file = getattr(instance, RENDITION_FIELDS[sender])
+    if field_file:
+        field_file.storage.delete(field_file.name)
+    renditions.delete_renditions(field_file.storage, instance.renditions)
+
+
+@receiver(post_delete, sender=ExportJob)
+def release_export_result(sender, instance, **kwargs):
+    if instance.result:
+        instance.result.storage.delete(instance.result.name)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=User)
+def schedule_renditions(sender, instance, update_fields=None, **kwargs):
+    field_name = RENDITION_FIELDS[sender]
+    if update_fields and field_name not in update_fields:
+        return
+    if renditions.is_stale(instance, field_name):
+        renditions.schedule(instance, field_name)
+
+
+@receiver(post_save, sender=Recipe)
+def update_search_index(sender, instance, update_fields=None, **kwargs):
+    if update_fields and SEARCH_FIELDS.isdisjoint(update_fields):
+        return
+    on_commit_batch(search.update_recipes, [instance.id])
+
+
+@receiver(post_delete, sender=Recipe)
+def remove_from_search_index(sender, instance, **kwargs):
+    search.remove_recipes([instance.id])
+
+
+@receiver(post_save, sender=Ingredient)
+def update_ingredient_recipes_in_search_index(sender, instance, **kwargs):
+    on_commit_batch(search.update_recipes, RecipeIngredients.objects.filter(
+        name=instance).values_list('recipe_name_id', flat=True))
+
+
+@receiver(pre_delete, sender=Ingredient)
+def refresh_recipes_without_ingredient(sender, instance, **kwargs):
+    recipe_ids = list(RecipeIngredients.objects.filter(
+        name=instance).values_list('recipe_name_id', flat=True))
+    on_commit_batch(recipe_ingredient_index.refresh_recipes, recipe_ids)
+    on_commit_batch(search.update_recipes, recipe_ids)
+    similar_recipes.schedule_refresh(recipe_ids)
+
+
+@receiver(post_delete, sender=Recipe)
+def remove_from_recipe_indexes(sender, instance, **kwargs):
+    on_commit_batch(recipe_ingredient_index.remove_recipes, [instance.id])
+    similar_recipes.schedule_refresh([instance.id])
+
+
+@receiver(post_save, sender=RecipeIngredients)
+def refresh_recipe_indexes(sender, instance, **kwargs):
+    on_commit_batch(recipe_ingredient_index.refresh_recipes,
+                    [instance.recipe_name_id])
+    similar_recipes.schedule_refresh([instance.recipe_name_id])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def refresh_similar_recipes_on_tags(sender, instance, action, reverse,
+                                    pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        similar_recipes.schedule_refresh([instance.id])
+    elif pk_set:
+        similar_recipes.schedule_refresh(pk_set)
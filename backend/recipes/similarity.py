@@ -0,0 +1,229 @@
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import fcntl
+import heapq
+import json
+import logging
+import os
+import tempfile
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Count, Q
+
+from core.transactions import on_commit_batch
+from .models import Recipe, RecipeIngredients
+
+logger = logging.getLogger(__name__)
+
+TOP_K = 10
+
+
+def load_features(recipe_ids=None):
+    recipes = Recipe.objects.all()
+    ingredients = RecipeIngredients.objects.order_by()
+    tags = Recipe.tags.through.objects.all()
+    if recipe_ids is not None:
+        recipes = recipes.filter(pk__in=recipe_ids)
+        ingredients = ingredients.filter(recipe_name_id__in=recipe_ids)
+        tags = tags.filter(recipe_id__in=recipe_ids)
+    features = {recipe_id: set() for recipe_id
+                in recipes.values_list('id', flat=True).iterator()}
+    for recipe_id, ingredient_id in ingredients.values_list(
+            'recipe_name_id', 'name_id').iterator():
+        features[recipe_id].add(f'i{ingredient_id}')
+    for recipe_id, tag_id in tags.values_list('recipe_id',
+                                              'tag_id').iterator():
+        features[recipe_id].add(f't{tag_id}')
+    return features
+
+
+def build_postings(features):
+    postings = defaultdict(list)
+    for recipe_id, recipe_features in features.items():
+        for feature in recipe_features:
+            postings[feature].append(recipe_id)
+    sizes = {recipe_id: len(recipe_features)
+             for recipe_id, recipe_features in features.items()}
+    return postings, sizes
+
+
+def load_postings(features):
+    wanted = set().union(*features.values())
+    ingredients = RecipeIngredients.objects.filter(name_id__in=[
+        int(feature[1:]) for feature in wanted if feature[0] == 'i'
+    ]).order_by()
+    tags = Recipe.tags.through.objects.filter(tag_id__in=[
+        int(feature[1:]) for feature in wanted if feature[0] == 't'
+    ])
+    postings = defaultdict(list)
+    for recipe_id, ingredient_id in ingredients.values_list(
+            'recipe_name_id', 'name_id').iterator():
+        postings[f'i{ingredient_id}'].append(recipe_id)
+    for recipe_id, tag_id in tags.values_list('recipe_id',
+                                              'tag_id').iterator():
+        postings[f't{tag_id}'].append(recipe_id)
+    candidates = (Q(pk__in=ingredients.values('recipe_name_id'))
+                  | Q(pk__in=tags.values('recipe_id')))
+    sizes = dict(Recipe.objects.filter(candidates).annotate(
+        size=Count('recipeingredients', distinct=True)
+        + Count('tags', distinct=True)
+    ).values_list('id', 'size'))
+    return postings, sizes
+
+
+def scores_for(recipe_id, features, postings, sizes):
+    own = features[recipe_id]
+    shared = Counter()
+    for feature in own:
+        shared.update(postings[feature])
+    del shared[recipe_id]
+    return {
+        other_id: round(count / (len(own) + sizes[other_id] - count), 4)
+        for other_id, count in shared.items()
+    }
+
+
+def top_k(scores, k):
+    return [[recipe_id, score] for score, recipe_id in heapq.nlargest(
+        k, ((score, recipe_id) for recipe_id, score in scores.items()))]
+
+
+class SimilarRecipes:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._neighbors = {}
+        self._k = TOP_K
+        self._executor = None
+        self._pending = set()
+
+    @property
+    def path(self):
+        return settings.SIMILAR_RECIPES_PATH
+
+    def _read(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return {}
+        with self._lock:
+            if mtime != self._mtime:
+                with open(self.path, encoding='utf-8') as file:
+                    data = json.load(file)
+                self._neighbors = {int(recipe_id): neighbors for
+                                   recipe_id, neighbors
+                                   in data['neighbors'].items()}
+                self._k = data['k']
+                self._mtime = mtime
+            return self._neighbors
+
+    @contextmanager
+    def _file_lock(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(f'{self.path}.lock', 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _write(self, neighbors, k):
+        directory = os.path.dirname(self.path)
+        with tempfile.NamedTemporaryFile('w', encoding='utf-8',
+                                         dir=directory, delete=False) as file:
+            json.dump({'k': k, 'neighbors': neighbors}, file,
+                      separators=(',', ':'))
+        os.replace(file.name, self.path)
+
+    def get(self, recipe_id):
+        return self._read().get(recipe_id, [])
+
+    def rebuild(self, k=TOP_K):
+        with self._file_lock():
+            return self._rebuild(k)
+
+    def _rebuild(self, k=TOP_K):
+        features = load_features()
+        postings, sizes = build_postings(features)
+        neighbors = {
+            recipe_id: top_k(
+                scores_for(recipe_id, features, postings, sizes), k)
+            for recipe_id in features
+        }
+        self._write(neighbors, k)
+        return len(neighbors)
+
+    def refresh(self, recipe_ids):
+        with self._file_lock():
+            if not os.path.exists(self.path):
+                return self._rebuild()
+            return self._refresh(recipe_ids)
+
+    def _refresh(self, recipe_ids):
+        current = self._read()
+        k = self._k
+        recipe_ids = set(recipe_ids)
+        features = load_features(recipe_ids)
+        postings, sizes = load_postings(features)
+        removed = recipe_ids - features.keys()
+        neighbors = {recipe_id: list(items) for recipe_id, items
+                     in current.items() if recipe_id not in removed}
+        stale = {other_id for other_id, items in neighbors.items()
+                 if any(item[0] in removed for item in items)}
+        for recipe_id in features:
+            scores = scores_for(recipe_id, features, postings, sizes)
+            neighbors[recipe_id] = top_k(scores, k)
+            for other_id, items in neighbors.items():
+                if other_id == recipe_id:
+                    continue
+                listed = [item for item in items if item[0] != recipe_id]
+                score = scores.get(other_id)
+                if len(listed) < len(items) and (
+                        score is None or len(items) == k
+                        and score < items[-1][1]):
+                    stale.add(other_id)
+                    continue
+                if score is not None:
+                    listed.append([recipe_id, score])
+                    listed.sort(key=lambda item: (item[1], item[0]),
+                                reverse=True)
+                neighbors[other_id] = listed[:k]
+        stale_features = load_features(stale - recipe_ids)
+        if stale_features:
+            postings, sizes = load_postings(stale_features)
+            for recipe_id in stale_features:
+                neighbors[recipe_id] = top_k(scores_for(
+                    recipe_id, stale_features, postings, sizes), k)
+        self._write(neighbors, k)
+        return len(neighbors)
+
+    def _refresh_pending(self):
+        with self._lock:
+            recipe_ids, self._pending = self._pending, set()
+        close_old_connections()
+        try:
+            self.refresh(recipe_ids)
+        except Exception:
+            logger.exception('Similar recipes refresh failed for %s',
+                             recipe_ids)
+        finally:
+            close_old_connections()
+
+    def _enqueue(self, recipe_ids):
+        with self._lock:
+            submit = not self._pending
+            self._pending.update(recipe_ids)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix='similar-recipes')
+        if submit:
+            self._executor.submit(self._refresh_pending)
+
+    def schedule_refresh(self, recipe_ids):
+        on_commit_batch(self._enqueue, recipe_ids)
+
+
+similar_recipes = SimilarRecipes()
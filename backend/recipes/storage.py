@@ -0,0 +1,104 @@
+from collections import Counter
+import hashlib
+import os
+
+from django.apps import apps
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .renditions import SOURCE_KEY
+
+MEDIA_REFERENCES = (
+    ('recipes.Recipe', 'image'),
+    ('recipes.Recipe', 'renditions'),
+    ('users.CustomUser', 'avatar'),
+    ('users.CustomUser', 'renditions'),
+    ('recipes.ExportJob', 'result'),
+)
+
+
+def stored_files():
+    return apps.get_model('recipes', 'StoredFile').objects
+
+
+def reference_counts():
+    counts = Counter()
+    for label, field_name in MEDIA_REFERENCES:
+        model = apps.get_model(label)
+        is_json = model._meta.get_field(
+            field_name).get_internal_type() == 'JSONField'
+        values = model.objects.values_list(field_name, flat=True)
+        for value in values.iterator():
+            if is_json:
+                counts.update(name for key, name in value.items()
+                              if key != SOURCE_KEY)
+            elif value:
+                counts[value] += 1
+    return counts
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def content_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        return os.path.join(directory, f'{digest.hexdigest()}{extension}')
+
+    def claim(self, name):
+        files = stored_files()
+        with transaction.atomic():
+            while not files.filter(name=name).update(
+                    references=F('references') + 1,
+                    updated_at=timezone.now()):
+                _, created = files.get_or_create(name=name,
+                                                 defaults={'references': 1})
+                if created:
+                    return
+
+    def reuse(self, name):
+        with transaction.atomic():
+            self.claim(name)
+            if self.exists(name):
+                return True
+            transaction.set_rollback(True)
+        return False
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.content_name(name, content)
+        with transaction.atomic():
+            self.claim(name)
+            if self.exists(name):
+                return name
+            return super().save(name, content, max_length=max_length)
+
+    def delete(self, name):
+        if not name:
+            return
+        with transaction.atomic():
+            stored_files().filter(name=name).update(
+                references=Greatest(F('references') - 1, 0),
+                updated_at=timezone.now())
+            transaction.on_commit(lambda: self.collect(name))
+
+    def collect(self, name):
+        with transaction.atomic():
+            stored = stored_files().select_for_update().filter(
+                name=name).first()
+            if stored is not None:
+                if stored.references:
+                    return False
+                stored.delete()
+            super().delete(name)
+        return True
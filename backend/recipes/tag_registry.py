@@ -0,0 +1,19 @@
+from core.versions import VersionedLocalCache
+from .models import Tag
+
+
+class TagRegistry(VersionedLocalCache):
+    model = Tag
+
+    def build(self):
+        return {tag.slug: tag for tag in Tag.objects.all()}
+
+    def choices(self):
+        return [(slug, tag.name) for slug, tag in self._load().items()]
+
+    def ids(self, slugs):
+        by_slug = self._load()
+        return [by_slug[slug].id for slug in slugs if slug in by_slug]
+
+
+tag_registry = TagRegistry()
@@ -0,0 +1,85 @@
+from recipes.management.commands.rebuild_shopping_lists import (
+    expected_totals, stored_totals)
+from recipes.models import Recipe, RecipeIngredients, ShoppingCart, User
+from recipes.tests.utils import (FoodgramTestCase, make_ingredients,
+                                 make_recipe, make_tags, make_user)
+
+
+class AdminShoppingListTests(FoodgramTestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = make_user(1)
+        self.buyer = make_user(2)
+        self.tags = make_tags(1)
+        self.ingredients = make_ingredients(4)
+        self.recipe = make_recipe(self.author, self.ingredients[:2],
+                                  self.tags)
+        Recipe.objects.filter(pk=self.recipe.pk).update(
+            image='recipes/images/recipe.png')
+        ShoppingCart.objects.add(user_id=self.buyer.id,
+                                 recipe_id=self.recipe.id)
+        admin = User.objects.create_superuser(
+            email='admin@example.com', username='admin', first_name='А',
+            last_name='Б', password='password')
+        self.client.force_login(admin)
+
+    def assert_in_sync(self):
+        self.assertEqual(stored_totals(), expected_totals())
+
+    def test_cart_rows_added_and_deleted_in_admin(self):
+        other = make_recipe(self.author, self.ingredients[1:3], self.tags,
+                            amount=5, name='Другой')
+        self.client.post('/admin/recipes/shoppingcart/add/', {
+            'user': self.buyer.id, 'recipe': other.id,
+            'added_at_0': '2026-01-01', 'added_at_1': '00:00:00'})
+        self.assertEqual(ShoppingCart.objects.count(), 2)
+        self.assert_in_sync()
+        cart = ShoppingCart.objects.get(recipe=self.recipe)
+        self.client.post(f'/admin/recipes/shoppingcart/{cart.id}/delete/',
+                         {'post': 'yes'})
+        self.assertEqual(ShoppingCart.objects.count(), 1)
+        self.assert_in_sync()
+
+    def test_recipe_inline_edits(self):
+        rows = list(self.recipe.recipeingredients.order_by('id'))
+        prefix = 'recipeingredients'
+        response = self.client.post(
+            f'/admin/recipes/recipe/{self.recipe.id}/change/', {
+                'name': self.recipe.name, 'text': self.recipe.text,
+                'cooking_time': self.recipe.cooking_time,
+                'author': self.author.id, 'tags': [self.tags[0].id],
+                f'{prefix}-TOTAL_FORMS': 3,
+                f'{prefix}-INITIAL_FORMS': 2,
+                f'{prefix}-0-id': rows[0].id,
+                f'{prefix}-0-recipe_name': self.recipe.id,
+                f'{prefix}-0-name': rows[0].name_id,
+                f'{prefix}-0-amount': 25,
+                f'{prefix}-1-id': rows[1].id,
+                f'{prefix}-1-recipe_name': self.recipe.id,
+                f'{prefix}-1-name': rows[1].name_id,
+                f'{prefix}-1-amount': rows[1].amount,
+                f'{prefix}-1-DELETE': 'on',
+                f'{prefix}-2-recipe_name': self.recipe.id,
+                f'{prefix}-2-name': self.ingredients[3].id,
+                f'{prefix}-2-amount': 7,
+            })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(dict(self.recipe.recipeingredients.values_list(
+            'name_id', 'amount')),
+            {self.ingredients[0].id: 25, self.ingredients[3].id: 7})
+        self.assert_in_sync()
+
+    def test_recipe_ingredient_admin(self):
+        row = self.recipe.recipeingredients.order_by('id').first()
+        self.client.post(
+            f'/admin/recipes/recipeingredients/{row.id}/change/', {
+                'recipe_name': self.recipe.id, 'name': row.name_id,
+                'amount': 3})
+        row.refresh_from_db()
+        self.assertEqual(row.amount, 3)
+        self.assert_in_sync()
+        self.client.post('/admin/recipes/recipeingredients/', {
+            'action': 'delete_selected', 'post': 'yes',
+            '_selected_action': [row.id]})
+        self.assertFalse(RecipeIngredients.objects.filter(pk=row.pk).exists())
+        self.assert_in_sync()
@@ -0,0 +1,101 @@
+from importlib import import_module
+from io import StringIO
+
+from django.apps import apps
+from django.core.management import call_command
+
+from recipes.models import Favorite, Recipe, ShoppingCart, User
+from recipes.tests.utils import (FoodgramTestCase, client_for,
+                                 make_ingredients, make_recipe, make_user)
+from users.models import Subscription
+
+fill_counters = import_module(
+    'recipes.migrations.0008_counters').fill_counters
+
+
+class CounterMaintenanceTests(FoodgramTestCase):
+    def setUp(self):
+        super().setUp()
+        self.users = [make_user(number) for number in range(3)]
+        ingredients = make_ingredients(1)
+        self.recipes = [make_recipe(self.users[0], ingredients,
+                                    name=f'Рецепт {number}')
+                        for number in range(2)]
+        self.admin = User.objects.create_superuser(
+            email='admin@example.com', username='admin', first_name='А',
+            last_name='Б', password='password')
+        self.client.force_login(self.admin)
+
+    def counts(self, model, field_name):
+        return list(model.objects.order_by('pk').values_list(
+            field_name, flat=True))
+
+    def assert_no_drift(self):
+        call_command('reconcile_counters', verify=True, stdout=StringIO())
+
+    def test_model_save_and_delete(self):
+        favorite = Favorite.objects.create(user=self.users[1],
+                                           recipe=self.recipes[0])
+        self.assertEqual(self.counts(Recipe, 'favorites_count'), [1, 0])
+        favorite.recipe = self.recipes[1]
+        favorite.save()
+        self.assertEqual(self.counts(Recipe, 'favorites_count'), [0, 1])
+        favorite.delete()
+        self.assertEqual(self.counts(Recipe, 'favorites_count'), [0, 0])
+        self.assert_no_drift()
+
+    def test_subscribe_response_has_new_followers_count(self):
+        response = client_for(self.users[1]).post(
+            f'/api/users/{self.users[0].id}/subscribe/')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['followers_count'], 1)
+
+    def test_admin_add_and_delete(self):
+        self.client.post('/admin/users/subscription/add/', {
+            'user': self.users[1].id, 'subscription': self.users[0].id})
+        self.client.post('/admin/recipes/shoppingcart/add/', {
+            'user': self.users[1].id, 'recipe': self.recipes[1].id,
+            'added_at_0': '2026-01-01', 'added_at_1': '00:00:00'})
+        self.users[0].refresh_from_db()
+        self.assertEqual(self.users[0].followers_count, 1)
+        self.assertEqual(self.counts(Recipe, 'in_carts_count'), [0, 1])
+        subscription = Subscription.objects.get()
+        response = self.client.post(
+            f'/admin/users/subscription/{subscription.id}/delete/',
+            {'post': 'yes'})
+        self.assertEqual(response.status_code, 302)
+        self.users[0].refresh_from_db()
+        self.assertEqual(self.users[0].followers_count, 0)
+        self.client.post('/admin/recipes/shoppingcart/', {
+            'action': 'delete_selected', 'post': 'yes',
+            '_selected_action': [ShoppingCart.objects.get().id]})
+        self.assertEqual(self.counts(Recipe, 'in_carts_count'), [0, 0])
+        self.assert_no_drift()
+
+    def test_recipe_author_change(self):
+        recipe = Recipe.objects.get(pk=self.recipes[0].pk)
+        recipe.author = self.users[2]
+        recipe.save()
+        self.assertEqual(
+            [user.recipes_count for user in User.objects.filter(
+                pk__in=[self.users[0].pk, self.users[2].pk]).order_by('pk')],
+            [1, 1])
+        self.assert_no_drift()
+
+    def test_full_save_keeps_concurrent_counter_updates(self):
+        recipe = Recipe.objects.get(pk=self.recipes[0].pk)
+        Favorite.objects.add(user_id=self.users[1].id, recipe_id=recipe.id)
+        recipe.name = 'Новое название'
+        recipe.save()
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.favorites_count, 1)
+
+    def test_migration_fills_counters(self):
+        Favorite.objects.add(user_id=self.users[1].id,
+                             recipe_id=self.recipes[0].id)
+        Subscription.objects.add(user_id=self.users[1].id,
+                                 subscription_id=self.users[0].id)
+        Recipe.objects.update(favorites_count=7)
+        User.objects.update(recipes_count=7, followers_count=7)
+        fill_counters(apps, None)
+        self.assert_no_drift()
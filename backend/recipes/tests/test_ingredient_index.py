@@ -0,0 +1,47 @@
+from core.versions import bump_version
+from recipes.ingredient_index import ingredient_index
+from recipes.models import Ingredient
+from recipes.tests.utils import FoodgramTestCase
+
+
+class IngredientIndexTests(FoodgramTestCase):
+    def setUp(self):
+        super().setUp()
+        Ingredient.objects.create(name='Ёжевика', measurement_unit='г')
+
+    def names(self, query):
+        return [ingredient.name for ingredient
+                in ingredient_index.search(query)]
+
+    def add_elsewhere(self, name):
+        Ingredient.objects.bulk_create(
+            [Ingredient(name=name, measurement_unit='г')])
+
+    def test_search_folds_case_and_yo(self):
+        self.assertEqual(self.names('ежев'), ['Ёжевика'])
+
+    def test_reloads_when_another_process_bumps_the_version(self):
+        self.names('е')
+        self.add_elsewhere('Ежевичный сироп')
+        self.assertEqual(self.names('ежеви'), ['Ёжевика'])
+        bump_version(Ingredient)
+        with self.settings(LOCAL_INDEX_TTL=-1):
+            self.assertEqual(self.names('ежеви'),
+                             ['Ёжевика', 'Ежевичный сироп'])
+
+    def test_keeps_serving_within_ttl(self):
+        self.names('е')
+        self.add_elsewhere('Ежевичный сироп')
+        bump_version(Ingredient)
+        self.assertEqual(self.names('ежеви'), ['Ёжевика'])
+        with self.settings(LOCAL_INDEX_TTL=-1):
+            self.assertEqual(self.names('ежеви'),
+                             ['Ёжевика', 'Ежевичный сироп'])
+
+    def test_saves_invalidate_on_commit(self):
+        self.names('е')
+        with self.captureOnCommitCallbacks(execute=True):
+            Ingredient.objects.create(name='Ежевичный сироп',
+                                      measurement_unit='мл')
+        self.assertEqual(self.names('ежеви'),
+                         ['Ёжевика', 'Ежевичный сироп'])
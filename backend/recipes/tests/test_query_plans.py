@@ -0,0 +1,183 @@
+import random
+import re
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.filters import RECIPE_ORDERINGS
+from api.views.recipe_views import RecipeViewSet
+from recipes.exports import shopping_list_rows
+from recipes.models import (Favorite, FeedEntry, Ingredient, Recipe,
+                            RecipeIngredients, RecipeRank, ShoppingCart,
+                            ShoppingListItem, Tag, User)
+from recipes.search import rebuild_index
+from users.models import Subscription
+from .utils import FoodgramTestCase
+
+PAGE_SIZE = 10
+SEED_SIZE = 3000
+SEED_PREFIX = 'plan-check-'
+SMALL_TABLES = {Tag._meta.db_table, Ingredient._meta.db_table}
+LARGE_TABLES = {model._meta.db_table for model in (
+    Recipe, RecipeIngredients, Recipe.tags.through, Favorite, ShoppingCart,
+    ShoppingListItem, FeedEntry, Subscription, User)}
+SORT_PATTERNS = {
+    'postgresql': re.compile(r'^\s*(->\s*)?(Incremental )?Sort\b', re.M),
+    'sqlite': re.compile(r'USE TEMP B-TREE FOR (RIGHT PART OF )?ORDER BY'),
+}
+
+
+def bulk_seed(model, objects, **lookup):
+    model.objects.bulk_create(objects, batch_size=1000)
+    return list(model.objects.filter(**lookup).order_by('pk'))
+
+
+def seed(size):
+    rng = random.Random(0)
+    users = bulk_seed(User, (
+        User(email=f'{SEED_PREFIX}{number}@example.com',
+             username=f'{SEED_PREFIX}{number}', first_name='План',
+             last_name='Проверка', password='!')
+        for number in range(max(size // 100, 20))
+    ), username__startswith=SEED_PREFIX)
+    tags = bulk_seed(Tag, (
+        Tag(name=f'{SEED_PREFIX}{number}', slug=f'{SEED_PREFIX}{number}')
+        for number in range(5)
+    ), slug__startswith=SEED_PREFIX)
+    ingredients = bulk_seed(Ingredient, (
+        Ingredient(name=f'{SEED_PREFIX}{number}', measurement_unit='г')
+        for number in range(200)
+    ), name__startswith=SEED_PREFIX)
+    recipes = bulk_seed(Recipe, (
+        Recipe(name=f'План {number}', text=SEED_PREFIX, cooking_time=10,
+               author=users[number % len(users)]) for number in range(size)
+    ), text=SEED_PREFIX)
+    RecipeIngredients.objects.bulk_create(
+        (RecipeIngredients(recipe_name=recipe, name=ingredient, amount=10)
+         for recipe in recipes
+         for ingredient in rng.sample(ingredients, 4)),
+        batch_size=1000)
+    RecipeRank.objects.bulk_create(
+        (RecipeRank(recipe=recipe, popularity=rng.randrange(100),
+                    trending=rng.random())
+         for recipe in recipes),
+        batch_size=1000)
+    Recipe.tags.through.objects.bulk_create(
+        (Recipe.tags.through(recipe=recipe, tag=rng.choice(tags))
+         for recipe in recipes),
+        batch_size=1000)
+    for model in (Favorite, ShoppingCart):
+        model.objects.bulk_create(
+            (model(user=user, recipe=recipe) for user in users
+             for recipe in rng.sample(recipes, min(len(recipes), 20))),
+            batch_size=1000)
+    subscriptions = [(user, author) for user in users
+                     for author in rng.sample(users, 5) if author != user]
+    Subscription.objects.bulk_create(
+        (Subscription(user=user, subscription=author)
+         for user, author in subscriptions),
+        batch_size=1000)
+    FeedEntry.objects.bulk_create(
+        (FeedEntry(user=user, recipe=recipe, author=author,
+                   created_at=recipe.created_at)
+         for user, author in subscriptions
+         for recipe in recipes[users.index(author)::len(users)][:20]),
+        batch_size=1000)
+    rebuild_index()
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    return users, tags
+
+
+def viewset_queryset(user, params=None, action='list'):
+    request = APIRequestFactory().get('/api/recipes/', params or {})
+    force_authenticate(request, user=user)
+    view = RecipeViewSet(action_map={'get': action}, format_kwarg=None,
+                         args=(), kwargs={})
+    view.request = view.initialize_request(request)
+    return view.filter_queryset(view.get_queryset())
+
+
+def recipe_list_queries(user, author, tag):
+    filters = (
+        ('', {}, True),
+        ('автора', {'author': author.id}, True),
+        ('по тегу', {'tags': tag.slug}, True),
+        ('избранного', {'is_favorited': 1}, False),
+        ('корзины', {'is_in_shopping_cart': 1}, False),
+    )
+    for ordering in (None, *RECIPE_ORDERINGS):
+        for label, params, ordered in filters:
+            if ordering is not None:
+                params = {**params, 'ordering': ordering}
+            name = ' '.join(filter(None, (
+                'Список рецептов', label,
+                ordering and f'ordering={ordering}')))
+            yield (name, viewset_queryset(user, params)[:PAGE_SIZE],
+                   ordered and (ordering is None or 'author' not in params))
+    yield ('Поиск рецептов',
+           viewset_queryset(user, {'search': 'План'})[:PAGE_SIZE], False)
+    yield ('Поиск рецептов по тегу',
+           viewset_queryset(user, {'search': 'План', 'tags': tag.slug}
+                            )[:PAGE_SIZE], False)
+
+
+def endpoint_queries(user, author, tag):
+    recipe_ids = list(viewset_queryset(user).values_list(
+        'id', flat=True)[:PAGE_SIZE])
+    with override_settings(FEED_FANOUT_LIMIT=-1):
+        entries, celebrity_recipes = FeedEntry.objects.for_user(
+            user).order_by('-created_at', '-recipe_id').querysets
+    return (
+        *recipe_list_queries(user, author, tag),
+        ('Подходящие рецепты', viewset_queryset(
+            user, action='cookable').select_related('author').filter(
+            pk__in=recipe_ids), False),
+        ('Лента подписок', entries[:PAGE_SIZE], True),
+        ('Лента: авторы без рассылки', celebrity_recipes[:PAGE_SIZE], False),
+        ('Ингредиенты рецептов', RecipeIngredients.objects.filter(
+            recipe_name_id__in=recipe_ids).select_related('name'), False),
+        ('Теги рецептов', Tag.objects.filter(recipes__id__in=recipe_ids),
+         False),
+        ('Список покупок', shopping_list_rows(user), False),
+        ('ETag корзины', ShoppingCart.objects.filter(user=user).order_by(
+            'recipe_id').values_list('recipe_id', 'recipe__updated_at'),
+         True),
+        ('Подписки', User.objects.filter(
+            subscription__user=user).order_by('username')[:PAGE_SIZE],
+         False),
+    )
+
+
+def plan_problems(plan, ordered):
+    problems = []
+    if connection.vendor == 'postgresql':
+        problems += [f'Seq Scan on {table}' for table
+                     in re.findall(r'Seq Scan on (\w+)', plan)
+                     if table in LARGE_TABLES]
+    elif connection.vendor == 'sqlite':
+        for name, rest in re.findall(r'\bSCAN (\S+)(.*)', plan):
+            if ('INDEX' not in rest and name not in SMALL_TABLES
+                    and name not in ('CONSTANT', 'SUBQUERY')):
+                problems.append(f'SCAN {name}')
+    sort_pattern = SORT_PATTERNS.get(connection.vendor)
+    if ordered and sort_pattern is not None and sort_pattern.search(plan):
+        problems.append('сортировка без индекса')
+    return problems
+
+
+@skipUnless(connection.vendor in SORT_PATTERNS,
+            'Планы проверяются только для PostgreSQL и SQLite.')
+class QueryPlanTests(FoodgramTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users, cls.tags = seed(SEED_SIZE)
+
+    def test_endpoint_queries_use_indexes(self):
+        for name, queryset, ordered in endpoint_queries(
+                self.users[0], self.users[1], self.tags[0]):
+            with self.subTest(name):
+                plan = queryset.explain()
+                self.assertEqual(plan_problems(plan, ordered), [], plan)
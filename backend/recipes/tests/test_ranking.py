@@ -0,0 +1,98 @@
+from datetime import timedelta
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from recipes.models import Favorite, RecipeRank, ShoppingCart
+from recipes.ranking import refresh_ranks
+from recipes.tests.utils import (FoodgramTestCase, client_for,
+                                 make_ingredients, make_recipe, make_tags,
+                                 make_user)
+
+
+class RecipeRankingTests(FoodgramTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = make_user(0)
+        cls.users = [make_user(number) for number in range(1, 5)]
+        cls.tags = make_tags(2)
+        ingredients = make_ingredients(1)
+        cls.recipes = [
+            make_recipe(cls.author, ingredients, [cls.tags[number % 2]],
+                        name=f'Рецепт {number}')
+            for number in range(4)
+        ]
+        for number, recipe in enumerate(cls.recipes):
+            recipe.cooking_time = 40 - number * 10
+            recipe.save(update_fields=['cooking_time'])
+        cls.now = timezone.now()
+        cls.add(Favorite, cls.recipes[0], cls.users, days=20)
+        cls.add(Favorite, cls.recipes[1], cls.users[:2], days=0)
+        cls.add(ShoppingCart, cls.recipes[1], cls.users[2:3], days=0)
+        cls.add(ShoppingCart, cls.recipes[2], cls.users[:2], days=3)
+
+    @classmethod
+    def add(cls, model, recipe, users, days):
+        for user in users:
+            model.objects.add(user_id=user.id, recipe_id=recipe.id)
+        model.objects.filter(recipe=recipe).update(
+            added_at=cls.now - timedelta(days=days))
+
+    def ids(self, **params):
+        response = client_for().get('/api/recipes/', params)
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.json()['results']]
+
+    def test_refresh_stores_popularity_and_decayed_trend(self):
+        self.assertEqual(refresh_ranks(self.now), (0, 3))
+        ranks = RecipeRank.objects.in_bulk()
+        self.assertEqual(
+            [ranks[recipe.id].popularity for recipe in self.recipes],
+            [4, 3, 2, 0])
+        self.assertEqual(ranks[self.recipes[0].id].trending, 0)
+        self.assertEqual(ranks[self.recipes[1].id].trending, 3)
+        self.assertTrue(
+            0 < ranks[self.recipes[2].id].trending < 2)
+
+    def test_refresh_is_incremental(self):
+        refresh_ranks(self.now)
+        self.assertEqual(refresh_ranks(self.now), (0, 0))
+        Favorite.objects.add(user_id=self.users[3].id,
+                             recipe_id=self.recipes[3].id)
+        self.assertEqual(refresh_ranks(self.now), (0, 1))
+
+    def test_orderings(self):
+        refresh_ranks(self.now)
+        first, second, third, fourth = (recipe.id for recipe in self.recipes)
+        self.assertEqual(self.ids(ordering='popular'),
+                         [first, second, third, fourth])
+        self.assertEqual(self.ids(ordering='trending'),
+                         [second, third, fourth, first])
+        self.assertEqual(self.ids(ordering='cooking_time'),
+                         [fourth, third, second, first])
+
+    def test_ordering_with_filters_and_pages(self):
+        refresh_ranks(self.now)
+        self.assertEqual(
+            self.ids(ordering='popular', tags=self.tags[0].slug),
+            [self.recipes[0].id, self.recipes[2].id])
+        self.assertEqual(
+            self.ids(ordering='popular', page=2, limit=3),
+            [self.recipes[3].id])
+
+    def test_new_recipes_start_with_zero_rank(self):
+        refresh_ranks(self.now)
+        newest = make_recipe(self.author, [], name='Новый рецепт')
+        self.assertEqual(RecipeRank.objects.get(recipe=newest).popularity, 0)
+        self.assertEqual(self.ids(ordering='popular'),
+                         [recipe.id for recipe in self.recipes[:3]]
+                         + [newest.id, self.recipes[3].id])
+
+    def test_rank_orderings_use_an_inner_join(self):
+        with CaptureQueriesContext(connection) as queries:
+            client_for().get('/api/recipes/', {'ordering': 'trending'})
+        sql = next(query['sql'] for query in queries.captured_queries
+                   if 'ORDER BY' in query['sql'])
+        self.assertIn('INNER JOIN "recipes_reciperank"', sql)
+        self.assertNotIn('NULLS LAST', sql)
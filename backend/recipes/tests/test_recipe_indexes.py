@@ -0,0 +1,84 @@
+from unittest import mock
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from core.transactions import OnCommitBatch, on_commit_batch
+from core.versions import bump_version
+from recipes.models import Recipe, RecipeIngredients
+from recipes.recipe_index import recipe_ingredient_index
+from recipes.tests.utils import (FoodgramTestCase, make_ingredients,
+                                 make_recipe, make_user)
+
+
+class RecipeIndexBatchTests(FoodgramTestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = make_user(1)
+        self.ingredients = make_ingredients(30)
+        self.recipes = [make_recipe(self.author, self.ingredients[number:],
+                                    name=f'Рецепт {number}')
+                        for number in range(3)]
+        self.ids = [recipe.id for recipe in self.recipes]
+
+    def batches(self, callbacks):
+        return {callback.callback: callback.items for callback in callbacks
+                if isinstance(callback, OnCommitBatch)}
+
+    def ranked_ids(self):
+        return {recipe_id for recipe_id, _, _
+                in recipe_ingredient_index.rank(
+                    [ingredient.id for ingredient in self.ingredients])}
+
+    def test_ingredient_rows_are_fast_deleted(self):
+        with CaptureQueriesContext(connection) as queries:
+            RecipeIngredients.objects.filter(recipe_name=self.recipes[0]
+                                             ).delete()
+        self.assertEqual(len(queries.captured_queries), 1)
+
+    def test_recipe_deletes_are_batched_per_transaction(self):
+        self.assertEqual(self.ranked_ids(), set(self.ids))
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            Recipe.objects.filter(id__in=self.ids[:2]).delete()
+        batches = self.batches(callbacks)
+        self.assertEqual(len(callbacks), len(batches))
+        self.assertEqual(batches[recipe_ingredient_index.remove_recipes],
+                         set(self.ids[:2]))
+        self.assertEqual(batches[self.enqueue], set(self.ids[:2]))
+        self.assertEqual(self.ranked_ids(), {self.ids[2]})
+        self.enqueue.assert_called_once_with(set(self.ids[:2]))
+
+    def test_ingredient_delete_refreshes_its_recipes(self):
+        self.ranked_ids()
+        ingredient = self.ingredients[0]
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            ingredient.delete()
+        batches = self.batches(callbacks)
+        self.assertEqual(batches[recipe_ingredient_index.refresh_recipes],
+                         {self.ids[0]})
+        self.assertEqual(recipe_ingredient_index.missing(self.ids[0], []),
+                         [item.id for item in self.ingredients[1:]])
+
+    def test_runs_immediately_outside_transactions(self):
+        callback = mock.Mock()
+        with mock.patch.object(connection, 'in_atomic_block', False):
+            on_commit_batch(callback, [1, 2, 2])
+        callback.assert_called_once_with({1, 2})
+
+
+class LocalIndexTTLTests(FoodgramTestCase):
+    def test_reloads_after_ttl_when_version_changes(self):
+        author = make_user(1)
+        ingredients = make_ingredients(2)
+        recipe = make_recipe(author, ingredients[:1])
+        self.assertEqual(recipe_ingredient_index.missing(recipe.id, []),
+                         [ingredients[0].id])
+        RecipeIngredients.objects.bulk_create([RecipeIngredients(
+            recipe_name=recipe, name=ingredients[1], amount=1)])
+        bump_version(RecipeIngredients)
+        self.assertEqual(recipe_ingredient_index.missing(recipe.id, []),
+                         [ingredients[0].id])
+        with self.settings(LOCAL_INDEX_TTL=-1):
+            self.assertEqual(
+                recipe_ingredient_index.missing(recipe.id, []),
+                [ingredient.id for ingredient in ingredients])
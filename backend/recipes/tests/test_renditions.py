@@ -0,0 +1,53 @@
+from unittest import mock
+
+from api.serializers.recipe_serializers import RecipeWriteSerializer
+from recipes.models import Recipe, User
+from recipes.tests.utils import (FoodgramTestCase, client_for,
+                                 make_ingredients, make_recipe, make_tags,
+                                 make_user)
+
+RENDITIONS = {'source': 'recipes/images/a.png',
+              'small': 'recipes/images/renditions/a-small.jpg'}
+
+
+class PreservedRenditionsTests(FoodgramTestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = make_user(1)
+        self.tags = make_tags(1)
+        self.ingredients = make_ingredients(1)
+        self.recipe = make_recipe(self.author, self.ingredients, self.tags)
+
+    def test_model_save_keeps_worker_renditions(self):
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        author = User.objects.get(pk=self.author.pk)
+        Recipe.objects.filter(pk=recipe.pk).update(renditions=RENDITIONS)
+        User.objects.filter(pk=author.pk).update(renditions=RENDITIONS)
+        recipe.name = 'Новое название'
+        recipe.save()
+        author.first_name = 'Другое'
+        author.save()
+        recipe.refresh_from_db()
+        author.refresh_from_db()
+        self.assertEqual(recipe.name, 'Новое название')
+        self.assertEqual(recipe.renditions, RENDITIONS)
+        self.assertEqual(author.first_name, 'Другое')
+        self.assertEqual(author.renditions, RENDITIONS)
+
+    def test_recipe_update_keeps_worker_renditions(self):
+        def finish_worker(recipe, ingredients_data):
+            Recipe.objects.filter(pk=recipe.pk).update(renditions=RENDITIONS)
+
+        with mock.patch.object(RecipeWriteSerializer, '_index_ingredients',
+                               side_effect=finish_worker):
+            response = client_for(self.author).patch(
+                f'/api/recipes/{self.recipe.id}/', {
+                    'name': 'Новое название',
+                    'tags': [self.tags[0].id],
+                    'ingredients': [{'id': self.ingredients[0].id,
+                                     'amount': 5}],
+                }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.name, 'Новое название')
+        self.assertEqual(self.recipe.renditions, RENDITIONS)
@@ -0,0 +1,66 @@
+from recipes.models import Ingredient
+from recipes.tests.utils import (FoodgramTestCase, client_for, make_recipe,
+                                 make_tags, make_user)
+
+
+class RecipeSearchTests(FoodgramTestCase):
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.authors = [make_user(1), make_user(2)]
+            self.tags = make_tags(2)
+            self.beet = Ingredient.objects.create(name='Свёкла',
+                                                  measurement_unit='г')
+
+    def make_recipe(self, name, text='Описание', author=None, tags=(),
+                    ingredients=()):
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = make_recipe(author or self.authors[0], ingredients,
+                                 tags, name=name)
+            recipe.text = text
+            recipe.save()
+        return recipe
+
+    def ids(self, **params):
+        response = client_for().get('/api/recipes/', params)
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.json()['results']]
+
+    def test_name_matches_rank_above_ingredients_and_text(self):
+        in_text = self.make_recipe('Суп', text='Почти как борщ')
+        in_name = self.make_recipe('Борщ')
+        self.assertEqual(self.ids(search='борщ'), [in_name.id, in_text.id])
+        by_ingredient = self.make_recipe('Салат', ingredients=[self.beet])
+        self.assertEqual(self.ids(search='свекла'), [by_ingredient.id])
+
+    def test_search_combines_with_tag_and_author_filters(self):
+        tagged = self.make_recipe('Борщ', tags=[self.tags[0]])
+        other_author = self.make_recipe('Борщ', author=self.authors[1],
+                                        tags=[self.tags[0]])
+        self.make_recipe('Борщ', tags=[self.tags[1]])
+        self.make_recipe('Плов', tags=[self.tags[0]])
+        self.assertEqual(
+            sorted(self.ids(search='борщ', tags=self.tags[0].slug)),
+            sorted([tagged.id, other_author.id]))
+        self.assertEqual(
+            self.ids(search='борщ', tags=self.tags[0].slug,
+                     author=self.authors[1].id),
+            [other_author.id])
+
+    def test_index_follows_created_and_updated_recipes(self):
+        self.assertEqual(self.ids(search='щи'), [])
+        recipe = self.make_recipe('Щи')
+        self.assertEqual(self.ids(search='щи'), [recipe.id])
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.name = 'Солянка'
+            recipe.save(update_fields=['name'])
+        self.assertEqual(self.ids(search='щи'), [])
+        self.assertEqual(self.ids(search='солянка'), [recipe.id])
+
+    def test_index_follows_ingredient_renames(self):
+        recipe = self.make_recipe('Салат', ingredients=[self.beet])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.beet.name = 'Буряк'
+            self.beet.save()
+        self.assertEqual(self.ids(search='свекла'), [])
+        self.assertEqual(self.ids(search='буряк'), [recipe.id])
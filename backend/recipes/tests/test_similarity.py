@@ -0,0 +1,67 @@
+import fcntl
+import json
+import random
+from unittest import mock
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import RecipeIngredients
+from recipes.similarity import similar_recipes
+from recipes.tests.utils import (FoodgramTestCase, make_ingredients,
+                                 make_recipe, make_tags, make_user)
+
+
+class SimilarRecipesRefreshTests(FoodgramTestCase):
+    def setUp(self):
+        super().setUp()
+        self.rng = random.Random(0)
+        self.author = make_user(1)
+        self.ingredients = make_ingredients(12)
+        self.tags = make_tags(3)
+        self.recipes = [self.make_recipe(number) for number in range(30)]
+
+    def make_recipe(self, number):
+        return make_recipe(self.author,
+                           self.rng.sample(self.ingredients, 3),
+                           self.rng.sample(self.tags, 1),
+                           name=f'Рецепт {number}')
+
+    def stored(self):
+        with open(similar_recipes.path, encoding='utf-8') as file:
+            return json.load(file)['neighbors']
+
+    def test_refresh_matches_rebuild(self):
+        similar_recipes.rebuild(k=3)
+        changed = self.recipes[0]
+        RecipeIngredients.objects.filter(recipe_name=changed).delete()
+        RecipeIngredients.objects.create(recipe_name=changed,
+                                         name=self.ingredients[0], amount=1)
+        added = self.make_recipe(30)
+        removed_id = self.recipes[1].id
+        self.recipes[1].delete()
+        changed_ids = [changed.id, added.id, removed_id]
+        with CaptureQueriesContext(connection) as queries:
+            similar_recipes.refresh(changed_ids)
+        refreshed = self.stored()
+        similar_recipes.rebuild(k=3)
+        self.assertEqual(refreshed, self.stored())
+        table = RecipeIngredients._meta.db_table
+        for query in queries.captured_queries:
+            if f'FROM "{table}"' in query['sql']:
+                self.assertIn('WHERE', query['sql'])
+
+    def test_refresh_writes_under_the_file_lock(self):
+        similar_recipes.rebuild(k=3)
+        write = similar_recipes._write
+
+        def locked_write(neighbors, k):
+            with open(f'{similar_recipes.path}.lock') as lock_file:
+                with self.assertRaises(BlockingIOError):
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            write(neighbors, k)
+
+        with mock.patch.object(similar_recipes, '_write',
+                               side_effect=locked_write) as patched:
+            similar_recipes.refresh([self.recipes[0].id])
+        patched.assert_called_once()
@@ -0,0 +1,91 @@
+from importlib import import_module
+import shutil
+import tempfile
+from unittest import mock
+
+from django.apps import apps
+from django.core.files.base import ContentFile
+from django.test import override_settings
+
+from recipes.models import Recipe, StoredFile
+from recipes.storage import ContentAddressedStorage, reference_counts
+from recipes.tests.utils import (FoodgramTestCase, make_ingredients,
+                                 make_recipe, make_user)
+
+fill_stored_files = import_module(
+    'recipes.migrations.0011_storedfile').fill_stored_files
+
+
+class StoredFileTests(FoodgramTestCase):
+    def setUp(self):
+        super().setUp()
+        self.location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.location)
+        media = override_settings(MEDIA_ROOT=self.location)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.storage = ContentAddressedStorage()
+
+    def save(self, content=b'image'):
+        return self.storage.save('recipes/images/a.png', ContentFile(content))
+
+    def references(self, name):
+        return StoredFile.objects.filter(name=name).values_list(
+            'references', flat=True).first()
+
+    def test_same_content_is_stored_once_and_counted(self):
+        name = self.save()
+        self.assertEqual(self.save(), name)
+        self.assertEqual(self.references(name), 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.storage.delete(name)
+        self.assertTrue(self.storage.exists(name))
+        self.assertEqual(self.references(name), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.storage.delete(name)
+        self.assertFalse(self.storage.exists(name))
+        self.assertIsNone(self.references(name))
+
+    def test_delete_rechecks_references_after_commit(self):
+        name = self.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.storage.delete(name)
+            self.assertTrue(self.storage.exists(name))
+            self.assertEqual(self.save(), name)
+        self.assertTrue(self.storage.exists(name))
+        self.assertEqual(self.references(name), 1)
+
+    def test_reuse_does_not_claim_missing_files(self):
+        self.assertFalse(self.storage.reuse('exports/missing.csv'))
+        self.assertIsNone(self.references('exports/missing.csv'))
+        name = self.save()
+        self.assertTrue(self.storage.reuse(name))
+        self.assertEqual(self.references(name), 2)
+
+    @mock.patch('recipes.renditions.schedule')
+    def test_deleting_recipe_releases_its_image(self, schedule):
+        recipe = make_recipe(make_user(1), make_ingredients(1))
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.image.save('a.png', ContentFile(b'image'))
+        name = recipe.image.name
+        self.assertEqual(self.references(name), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            Recipe.objects.filter(pk=recipe.pk).delete()
+        self.assertFalse(self.storage.exists(name))
+
+    def test_migration_fills_references(self):
+        author = make_user(1)
+        ingredients = make_ingredients(1)
+        recipes = [make_recipe(author, ingredients) for _ in range(2)]
+        Recipe.objects.filter(pk__in=[recipe.pk for recipe in recipes]
+                              ).update(image='recipes/images/a.png',
+                                       renditions={
+                                           'source': 'recipes/images/a.png',
+                                           'small': 'recipes/images/b.jpg'})
+        StoredFile.objects.all().delete()
+        fill_stored_files(apps, None)
+        self.assertEqual(
+            dict(StoredFile.objects.values_list('name', 'references')),
+            {'recipes/images/a.png': 2, 'recipes/images/b.jpg': 2})
+        self.assertEqual(reference_counts(), {'recipes/images/a.png': 2,
+                                              'recipes/images/b.jpg': 2})
@@ -0,0 +1,31 @@
+from core.versions import bump_version
+from recipes.models import Tag
+from recipes.tag_registry import tag_registry
+from recipes.tests.utils import (FoodgramTestCase, client_for,
+                                 make_ingredients, make_recipe, make_tags,
+                                 make_user)
+
+
+class TagRegistryTests(FoodgramTestCase):
+    def test_tag_filter_returns_each_recipe_once(self):
+        tags = make_tags(2)
+        recipe = make_recipe(make_user(1), make_ingredients(1), tags)
+        response = client_for().get(
+            '/api/recipes/', {'tags': [tag.slug for tag in tags]})
+        self.assertEqual(response.json()['count'], 1)
+        self.assertEqual(response.json()['results'][0]['id'], recipe.id)
+
+    def test_reloads_after_ttl_when_version_changes(self):
+        tag_registry.ids(['new'])
+        Tag.objects.bulk_create([Tag(name='Новый', slug='new')])
+        bump_version(Tag)
+        self.assertEqual(tag_registry.ids(['new']), [])
+        with self.settings(LOCAL_INDEX_TTL=-1):
+            self.assertEqual(tag_registry.ids(['new']),
+                             [Tag.objects.get(slug='new').id])
+
+    def test_saves_invalidate_on_commit(self):
+        tag_registry.ids(['new'])
+        with self.captureOnCommitCallbacks(execute=True):
+            tag = Tag.objects.create(name='Новый', slug='new')
+        self.assertEqual(tag_registry.ids(['new']), [tag.id])
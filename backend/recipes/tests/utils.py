@@ -0,0 +1,80 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from recipes.ingredient_index import ingredient_index
+from recipes.models import Ingredient, Recipe, RecipeIngredients, Tag
+from recipes.recipe_index import recipe_ingredient_index
+from recipes.similarity import similar_recipes
+from recipes.tag_registry import tag_registry
+
+User = get_user_model()
+
+LOCAL_CACHES = {
+    alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': f'test-{alias}'}
+    for alias in ('default', 'recipes')
+}
+
+
+def make_user(number):
+    return User.objects.create_user(
+        email=f'user{number}@example.com', username=f'user{number}',
+        first_name='Имя', last_name='Фамилия', password='password')
+
+
+def make_tags(count):
+    return [Tag.objects.create(name=f'Тег {number}', slug=f'tag{number}')
+            for number in range(count)]
+
+
+def make_ingredients(count):
+    return [Ingredient.objects.create(name=f'Ингредиент {number}',
+                                      measurement_unit='г')
+            for number in range(count)]
+
+
+def make_recipe(author, ingredients, tags=(), amount=10, name='Рецепт'):
+    recipe = Recipe.objects.create(author=author, name=name,
+                                   text='Описание', cooking_time=10)
+    RecipeIngredients.objects.bulk_create(
+        RecipeIngredients(recipe_name=recipe, name=ingredient, amount=amount)
+        for ingredient in ingredients)
+    recipe.tags.set(tags)
+    return recipe
+
+
+def client_for(user=None):
+    client = APIClient()
+    if user is not None:
+        client.force_authenticate(user)
+    return client
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class FoodgramTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.reset_caches()
+        enqueue = mock.patch.object(similar_recipes, '_enqueue')
+        self.enqueue = enqueue.start()
+        self.addCleanup(enqueue.stop)
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        similar_path = override_settings(SIMILAR_RECIPES_PATH=os.path.join(
+            directory, 'similar_recipes.json'))
+        similar_path.enable()
+        self.addCleanup(similar_path.disable)
+
+    def reset_caches(self):
+        cache.clear()
+        caches['recipes'].clear()
+        ingredient_index.invalidate()
+        tag_registry.invalidate()
+        recipe_ingredient_index.invalidate()
@@ -6,7 +6,8 @@ from .models import CustomUser, Subscription
 
 @admin.register(CustomUser)
 class UserAdmin(UserAdmin):
-    list_display = ('username', 'first_name', 'last_name')
+    list_display = ('username', 'first_name', 'last_name', 'recipes_count',
+                    'followers_count')
     search_fields = ('first_name', 'last_name')
     list_filter = ('username',)
 
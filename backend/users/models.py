@@ -2,10 +2,18 @@ from django.contrib.auth import validators
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 
+from core.models import PreservedFieldsMixin, UniquePairMixin
+from core.querysets import UniquePairQuerySet
+
 MAX_LEN = 30
 
 
-class CustomUser(AbstractUser):
+class SubscriptionQuerySet(UniquePairQuerySet):
+    pair_fields = ('user', 'subscription')
+    counter = ('subscription', 'followers_count')
+
+
+class CustomUser(PreservedFieldsMixin, AbstractUser):
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
 
@@ -19,6 +27,13 @@ class CustomUser(AbstractUser):
     last_name = models.CharField(max_length=100, verbose_name='Фамилия')
     avatar = models.ImageField(upload_to='images/avatars/', null=True,
                                default=None)
+    renditions = models.JSONField(default=dict, blank=True, editable=False,
+                                  verbose_name='Уменьшенные копии')
+    recipes_count = models.PositiveIntegerField(default=0, editable=False,
+                                                verbose_name='Рецептов')
+    followers_count = models.PositiveIntegerField(default=0, editable=False,
+                                                  verbose_name='Подписчиков')
+    preserved_fields = ('renditions', 'recipes_count', 'followers_count')
 
     class Meta:
         ordering = ('username',)
@@ -29,13 +44,14 @@ class CustomUser(AbstractUser):
         return self.username[:MAX_LEN]
 
 
-class Subscription(models.Model):
+class Subscription(UniquePairMixin, models.Model):
     subscription = models.ForeignKey(CustomUser, related_name='subscription',
                                      verbose_name='Подписка',
                                      on_delete=models.CASCADE)
     user = models.ForeignKey(CustomUser, related_name='follower',
                              verbose_name='Подписчик',
                              on_delete=models.CASCADE)
+    objects = SubscriptionQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Подписка'
@@ -45,6 +61,6 @@ class Subscription(models.Model):
 
     def __str__(self):
         return (
-            f'{self.user[:MAX_LEN]} на '
-            f'на {self.subscription[:MAX_LEN]}'
+            f'{str(self.user)[:MAX_LEN]} на '
+            f'на {str(self.subscription)[:MAX_LEN]}'
         )